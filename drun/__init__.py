@@ -1,2 +1,4 @@
-__all__ = ["__version__"]
+__all__ = ["__version__", "cache"]
 __version__ = "2.4.12"
+
+from drun.utils.cache import cache  # noqa: E402
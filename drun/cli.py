@@ -13,6 +13,11 @@ from typing import Any, Dict, List, Optional, Tuple
 import typer
 import yaml
 
+from drun.engine.app_transport import DEFAULT_APP_BASE_URL, app_transport
+from drun.engine.breaker import CircuitBreakerRegistry
+from drun.engine.cassette import Cassette, parse_match
+from drun.engine.transport import parse_resolve
+from drun.engine.ratelimit import RateLimiter
 from drun.loader.collector import discover, match_tags
 from drun.loader.yaml_loader import expand_parameters, load_yaml_file
 from drun.loader.hooks import get_functions_for
@@ -24,11 +29,15 @@ from drun.models.step import Step
 from drun.models.validators import Validator
 from drun.models.report import RunReport
 from drun.reporter.json_reporter import write_json
+from drun.runner.bench import find_stream_step, format_sweep_table, parse_sweep, run_stream_sweep
+from drun.runner.concurrency import AIMDController, parse_workers, run_concurrently
 from drun.runner.runner import Runner
 from drun.templating.engine import TemplateEngine
 from drun.utils.config import get_env_clean, get_system_name
 from drun.utils.errors import LoadError
 from drun.utils.logging import setup_logging, get_logger
+from drun.utils.metrics import MetricsExporter, MetricsRegistry, set_active_metrics
+from drun.utils.tracing import Tracer, set_active_tracer
 
 
 def _sanitize_filename_component(value: str, fallback: str) -> str:
@@ -1093,6 +1102,48 @@ def run(
         show_default=False,
     ),
     notify_attach_html: bool = typer.Option(False, "--notify-attach-html/--no-notify-attach-html", help="在邮件中附加 HTML 报告（如果启用邮件）", show_default=False),
+    retry_budget: float = typer.Option(
+        20.0,
+        "--retry-budget",
+        help="全局重试预算：重试次数不超过首次请求数的百分比（至少允许 10 次；设为负数表示不限制）",
+    ),
+    circuit_breaker: bool = typer.Option(
+        False,
+        "--circuit-breaker/--no-circuit-breaker",
+        help="启用按主机熔断：失败率过高时后续请求立即失败，冷却后半开探测恢复",
+        show_default=False,
+    ),
+    cb_failure_ratio: float = typer.Option(0.5, "--cb-failure-ratio", help="熔断触发的失败率阈值（0-1）"),
+    cb_min_requests: int = typer.Option(5, "--cb-min-requests", help="统计窗口内触发熔断所需的最少请求数"),
+    cb_cooldown: float = typer.Option(30.0, "--cb-cooldown", help="熔断打开后的冷却时间（秒），之后发送探测请求"),
+    rps: Optional[float] = typer.Option(None, "--rps", help="每个主机的最大请求速率（次/秒），覆盖环境文件 rate_limits 中的 '*'"),
+    workers: str = typer.Option("1", "--workers", help="并发执行用例实例的线程数，或 auto（按 p95 与错误率自适应调整）"),
+    max_workers: int = typer.Option(16, "--max-workers", help="--workers auto 时的并发上限"),
+    target_p95: float = typer.Option(1000.0, "--target-p95", help="--workers auto 时的目标 p95 响应时间（毫秒）"),
+    record: Optional[str] = typer.Option(None, "--record", help="将所有请求/响应（含流式）录制到目录（cassette）"),
+    replay: Optional[str] = typer.Option(None, "--replay", help="从录制目录回放响应，不访问真实后端"),
+    replay_match: str = typer.Option(
+        "method,path,query,body",
+        "--replay-match",
+        help="回放匹配字段，逗号分隔：method,path,query,body（body 为规范化后的请求体）",
+    ),
+    app: Optional[str] = typer.Option(None, "--app", help="进程内测试 ASGI/WSGI 应用，如 myservice.main:app（覆盖 config.app）"),
+    uds: Optional[str] = typer.Option(None, "--uds", help="通过 Unix domain socket 发送请求（覆盖 config.uds）"),
+    resolve: List[str] = typer.Option([], "--resolve", help="将主机解析固定到指定地址 host:port:addr（可重复，同 curl --resolve）"),
+    traceparent: bool = typer.Option(
+        False,
+        "--traceparent/--no-traceparent",
+        help="为每个步骤注入 W3C traceparent 与 x-request-id（运行级 trace id，步骤级 span id）",
+        show_default=False,
+    ),
+    trace_out: Optional[str] = typer.Option(
+        None,
+        "--trace-out",
+        help="将运行/套件/用例/步骤/Hook/HTTP/DB span 以 OTLP JSON 增量写入文件（启用 --traceparent 时默认 reports/<系统名>-<时间>.otlp.json）",
+    ),
+    metrics_out: Optional[str] = typer.Option(None, "--metrics-out", help="Prometheus 文本格式指标文件（node-exporter textfile collector），运行期间定期更新"),
+    metrics_push: Optional[str] = typer.Option(None, "--metrics-push", help="定期推送指标到 Pushgateway，如 http://pushgateway:9091（默认 job=drun）"),
+    metrics_interval: float = typer.Option(15.0, "--metrics-interval", help="指标文件更新/推送间隔（秒）"),
 ):
     """运行测试用例或测试套件"""
     # default timestamp; set up console logging first (no file) to avoid writing to a wrong file
@@ -1222,40 +1273,117 @@ def run(
             typer.echo(line)
         raise typer.Exit(code=2)
 
-    # Execute
-    runner = Runner(
-        log=log,
-        failfast=failfast,
-        log_debug=(log_level.upper() == "DEBUG"),
-        reveal_secrets=reveal_secrets,
-        log_response_headers=response_headers,
-    )
-    templater = TemplateEngine()
-    instance_results = []
-    log.info(f"[RUN] Discovered files: {len(files)} | Matched cases: {len(items)} | Failfast={failfast}")
-    # Sanity check: ensure cases with relative step URLs have a base_url from any source
-    def _need_base_url(case: Case) -> bool:
+    try:
+        n_workers, adaptive = parse_workers(workers)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--workers")
+    if app:
         try:
-            for st in case.steps:
-                path = getattr(st.request, "path", "") or ""
-                u = str(path).strip()
-                # if not absolute (no scheme), we treat it as relative and require base_url
-                if not (u.startswith("http://") or u.startswith("https://")):
-                    return True
-            return False
-        except Exception:
-            return False
-
-    for c, meta in items:
-        funcs = get_functions_for(Path(meta.get("file", path)).resolve())
-        param_sets = expand_parameters(c.parameters, source_path=meta.get("file"))
-        for ps in param_sets:
+            app_transport(app)
+        except Exception as e:
+            raise typer.BadParameter(f"cannot load app {app!r}: {e}", param_hint="--app")
+    try:
+        cli_resolve = {f"{h}:{p}": a for (h, p), a in parse_resolve(list(resolve)).items()}
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--resolve")
+    if record and replay:
+        raise typer.BadParameter("--record and --replay cannot be used together", param_hint="--record")
+    cassette: Optional[Cassette] = None
+    try:
+        if record:
+            cassette = Cassette(record, "record")
+            log.info(f"[CASSETTE] Recording to {record}")
+        elif replay:
+            cassette = Cassette(replay, "replay", match=parse_match(replay_match))
+            log.info(f"[CASSETTE] Replaying from {replay} (match={replay_match})")
+    except (ValueError, OSError) as e:
+        raise typer.BadParameter(str(e), param_hint="--replay" if replay else "--record")
+
+    tracer: Optional[Tracer] = None
+    metrics_exporter: Optional[MetricsExporter] = None
+    run_error: Optional[str] = None
+    try:
+        if traceparent or trace_out:
+            trace_target = trace_out or f"reports/{_sanitize_filename_component(system_name, 'report')}-{ts}.otlp.json"
+            try:
+                tracer = Tracer(trace_target, inject=traceparent)
+            except OSError as e:
+                raise typer.BadParameter(str(e), param_hint="--trace-out")
+            # DB proxy queries made from hooks join the trace as well
+            set_active_tracer(tracer)
+
+        if metrics_out or metrics_push:
+            metrics_registry = MetricsRegistry()
+            metrics_exporter = MetricsExporter(metrics_registry, path=metrics_out, push_url=metrics_push, interval=metrics_interval)
+            # DB proxy query times from hooks are recorded as well
+            set_active_metrics(metrics_registry)
+            metrics_exporter.start()
+            log.info(f"[METRICS] Exporting every {metrics_exporter.interval:.0f}s to {', '.join(t for t in (metrics_out, metrics_push) if t)}")
+
+        # Execute
+        runner = Runner(
+            log=log,
+            failfast=failfast,
+            log_debug=(log_level.upper() == "DEBUG"),
+            reveal_secrets=reveal_secrets,
+            log_response_headers=response_headers,
+            retry_budget=retry_budget if retry_budget >= 0 else None,
+            circuit_breaker=(
+                CircuitBreakerRegistry(
+                    failure_ratio=cb_failure_ratio,
+                    min_requests=cb_min_requests,
+                    cooldown=cb_cooldown,
+                )
+                if circuit_breaker
+                else None
+            ),
+            rate_limiter=RateLimiter(
+                default_rps=rps,
+                host_limits=env_store.get("rate_limits") if isinstance(env_store.get("rate_limits"), dict) else None,
+            ),
+            cassette=cassette,
+            tracer=tracer,
+            metrics=metrics_exporter.registry if metrics_exporter is not None else None,
+        )
+        if tracer is not None:
+            log.info(f"[TRACE] trace_id={tracer.trace_id} inject={traceparent} file={tracer.path}")
+        templater = TemplateEngine()
+        instance_results = []
+        log.info(f"[RUN] Discovered files: {len(files)} | Matched cases: {len(items)} | Failfast={failfast}")
+        # Sanity check: ensure cases with relative step URLs have a base_url from any source
+        def _need_base_url(case: Case) -> bool:
+            try:
+                for st in case.steps:
+                    path = getattr(st.request, "path", "") or ""
+                    u = str(path).strip()
+                    # if not absolute (no scheme), we treat it as relative and require base_url
+                    if not (u.startswith("http://") or u.startswith("https://")):
+                        return True
+                return False
+            except Exception:
+                return False
+
+        def _prepare_case(c: Case, meta: Dict[str, Any], funcs: Dict[str, Any]) -> None:
+            if app:
+                c.config.app = app
+            # Connection overrides: CLI > case config > env file
+            if uds or (not c.config.uds and env_store.get("uds")):
+                c.config.uds = str(uds or env_store.get("uds"))
+            env_resolve = env_store.get("resolve")
+            if isinstance(env_resolve, dict) or cli_resolve:
+                merged = {str(k): str(v) for k, v in (env_resolve if isinstance(env_resolve, dict) else {}).items()}
+                merged.update(c.config.resolve or {})
+                merged.update(cli_resolve)
+                c.config.resolve = merged
             # Promote BASE_URL to base_url if not set
             if (not c.config.base_url) and (base := global_vars.get("BASE_URL") or global_vars.get("base_url") or env_store.get("BASE_URL") or env_store.get("base_url")):
                 c.config.base_url = base
             # Render base_url if it contains template syntax
             if c.config.base_url and ("{{" in c.config.base_url or "${" in c.config.base_url):
                 c.config.base_url = templater.render_value(c.config.base_url, global_vars, funcs, envmap=env_store)
+            # In-process apps do not need a reachable host
+            if c.config.app and not c.config.base_url:
+                c.config.base_url = DEFAULT_APP_BASE_URL
             # If case has relative URLs but still no base_url after all sources, print a clear guidance and exit
             if _need_base_url(c) and not (c.config.base_url and str(c.config.base_url).strip()):
                 msg_lines = [
@@ -1274,14 +1402,84 @@ def run(
                 for line in msg_lines:
                     typer.echo(line)
                 raise typer.Exit(code=2)
+
+        def _run_instance(job: Tuple[Case, Dict[str, Any], Dict[str, Any], Dict[str, Any]]):
+            c, meta, funcs, ps = job
             log.info(f"[CASE] Start: {c.config.name or 'Unnamed'} | params={ps}")
             res = runner.run_case(c, global_vars=global_vars, params=ps, funcs=funcs, envmap=env_store, source=meta.get("file"))
             log.info(f"[CASE] Result: {res.name} | status={res.status} | duration={res.duration_ms:.1f}ms")
-            instance_results.append(res)
-            if failfast and res.status == "failed":
-                break
+            return res
+
+        controller: Optional[AIMDController] = None
+        run_t0 = time.perf_counter()
+        if n_workers == 1 and not adaptive:
+            for c, meta in items:
+                funcs = get_functions_for(Path(meta.get("file", path)).resolve())
+                param_sets = expand_parameters(c.parameters, source_path=meta.get("file"))
+                for ps in param_sets:
+                    _prepare_case(c, meta, funcs)
+                    res = _run_instance((c, meta, funcs, ps))
+                    instance_results.append(res)
+                    if failfast and res.status == "failed":
+                        break
+        else:
+            def _iter_jobs():
+                # Evaluated lazily on the main thread as worker slots free up
+                for c, meta in items:
+                    funcs = get_functions_for(Path(meta.get("file", path)).resolve())
+                    for ps in expand_parameters(c.parameters, source_path=meta.get("file")):
+                        _prepare_case(c, meta, funcs)
+                        yield (c, meta, funcs, ps)
+
+            if adaptive:
+                controller = AIMDController(maximum=max_workers, target_p95_ms=target_p95)
+                log.info(f"[CONCURRENCY] Adaptive workers: start={controller.limit} max={max_workers} target_p95={target_p95:.0f}ms")
+            else:
+                log.info(f"[CONCURRENCY] Workers: {n_workers}")
+            instance_results = run_concurrently(
+                _iter_jobs(),
+                _run_instance,
+                workers=n_workers,
+                controller=controller,
+                stop=(lambda r: failfast and r.status == "failed"),
+            )
 
-    report_obj: RunReport = runner.build_report(instance_results)
+        if cassette is not None:
+            cassette.close()
+        report_obj: RunReport = runner.build_report(instance_results)
+        if controller is not None:
+            report_obj.summary["concurrency"] = {**controller.summary(), "wall_ms": (time.perf_counter() - run_t0) * 1000.0}
+            trace_text = " ".join(f"{e['t_s']:.1f}s:{e['workers']}" for e in controller.trace)
+            log.info(f"[CONCURRENCY] Trace (time:workers): {trace_text}")
+        elif n_workers > 1:
+            report_obj.summary["concurrency"] = {"mode": "fixed", "workers": n_workers, "wall_ms": (time.perf_counter() - run_t0) * 1000.0}
+        if metrics_exporter is not None:
+            # Final export: frozen run duration, drun_run_in_progress 0
+            metrics_exporter.stop()
+            set_active_metrics(None)
+            metrics_exporter = None
+        if tracer is not None:
+            tracer.close(attributes={
+                "drun.cases": report_obj.summary.get("total", 0),
+                "drun.failed": report_obj.summary.get("failed", 0),
+            })
+            set_active_tracer(None)
+            report_obj.summary["trace"] = {"trace_id": tracer.trace_id, "file": str(tracer.path), "spans": tracer.span_count}
+            tracer = None
+    except BaseException as e:
+        run_error = str(e) or type(e).__name__
+        raise
+    finally:
+        # Aborted runs (Ctrl-C, a LoadError while expanding jobs, ...) still finalize
+        # the cassette index, the final metrics export and the trace file
+        if cassette is not None:
+            cassette.close()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+            set_active_metrics(None)
+        if tracer is not None:
+            tracer.close(error=run_error or "run aborted")
+            set_active_tracer(None)
     # Print summary (standardized log format)
     s = report_obj.summary
     log.info(
@@ -1296,10 +1494,67 @@ def run(
             s.get("steps_failed", 0),
             s.get("steps_skipped", 0),
         )
+    if s.get("timings"):
+        t = s["timings"]
+        log.info(
+            "[TIMING] render=%.1fms hooks=%.1fms send=%.1fms extract=%.1fms validate=%.1fms overhead=%.1fms",
+            t.get("render", 0.0),
+            t.get("setup_hooks", 0.0) + t.get("teardown", 0.0),
+            t.get("send", 0.0),
+            t.get("extract", 0.0),
+            t.get("validate", 0.0),
+            t.get("overhead", 0.0),
+        )
+    if s.get("retries"):
+        rs = s["retries"]
+        log.info(
+            "[RETRY] Total retries: %s (budget %s%%, denied: %s)",
+            rs.get("retries", 0),
+            rs.get("budget_percent") if rs.get("budget_percent") is not None else "unlimited",
+            rs.get("budget_denied", 0),
+        )
+    for host, st in (s.get("circuit_breaker") or {}).items():
+        log.warning(
+            "[BREAKER] %s state=%s opened=%s rejected=%s",
+            host, st.get("state"), st.get("opened", 0), st.get("rejected", 0),
+        )
+    if s.get("rate_limit"):
+        rl = s["rate_limit"]
+        log.info(
+            "[RATE] Throttled requests: %s wait: %.1fms limits: %s case limits: %s",
+            rl.get("throttled_requests", 0), rl.get("throttle_wait_ms", 0.0), rl.get("limits"), rl.get("case_limits"),
+        )
+    if s.get("cassette"):
+        cs = s["cassette"]
+        log.info(
+            "[CASSETTE] mode=%s recorded=%s replayed=%s misses=%s dir=%s",
+            cs.get("mode"), cs.get("recorded", 0), cs.get("replayed", 0), cs.get("misses", 0), cs.get("dir"),
+        )
+    if s.get("response_cache"):
+        rc = s["response_cache"]
+        log.info(
+            "[CACHE] Response cache hits: %s misses: %s coalesced: %s",
+            rc.get("hits", 0), rc.get("misses", 0), rc.get("coalesced", 0),
+        )
+    for endpoint, st in (s.get("server_timing") or {}).items():
+        log.info(
+            "[SERVER-TIMING] %s n=%s client p50=%.1fms backend p50=%.1fms overhead p50=%.1fms %s",
+            endpoint,
+            st.get("count", 0),
+            st["client_ms"]["p50"],
+            st["backend_ms"]["p50"],
+            st["client_overhead_ms"]["p50"],
+            " ".join(f"{k}={v['p50']:.1f}ms" for k, v in (st.get("metrics") or {}).items()),
+        )
+    if s.get("hook_cache"):
+        hc = s["hook_cache"]
+        log.info("[CACHE] Hook cache hits: %s misses: %s", hc.get("hits", 0), hc.get("misses", 0))
 
     html_component = _sanitize_filename_component(system_name, "report")
     html_target = html or f"reports/{html_component}-{ts}.html"
 
+    if s.get("trace"):
+        log.info("[TRACE] %s OTLP spans written to %s (trace_id=%s)", s["trace"]["spans"], s["trace"]["file"], s["trace"]["trace_id"])
     if report:
         write_json(report_obj, report)
         log.info("[CASE] JSON report written to %s", report)
@@ -1427,6 +1682,92 @@ def run(
         raise typer.Exit(code=1)
 
 
+@app.command("bench")
+def bench(
+    path: str = typer.Argument(..., help="包含流式步骤（stream: true）的用例文件"),
+    stream_sweep: str = typer.Option(..., "--stream-sweep", help="并发等级，逗号分隔，如 1,2,4,8,16,32"),
+    step: Optional[str] = typer.Option(None, "--step", help="要压测的步骤名称或序号（默认第一个 stream: true 步骤）"),
+    case_name: Optional[str] = typer.Option(None, "--case", help="文件包含多个用例时指定用例名称"),
+    requests: Optional[int] = typer.Option(None, "--requests", help="每个并发等级的请求数（默认 max(2×并发, 8)）"),
+    knee_factor: float = typer.Option(2.0, "--knee-factor", help="TTFT/事件间隔 p95 超过最低并发等级的倍数即视为性能拐点"),
+    vars: List[str] = typer.Option([], "--vars", help="变量覆盖 k=v（可重复）"),
+    env_file: Optional[str] = typer.Option(None, "--env-file", help=".env 文件路径（默认 .env）"),
+    report: Optional[str] = typer.Option(None, "--report", help="输出 JSON 结果到文件"),
+    log_level: str = typer.Option("WARNING", "--log-level", help="日志级别"),
+):
+    """流式接口并发扫描：测量各并发等级下的 TTFT、事件间隔与吞吐，并找出性能拐点"""
+    setup_logging(log_level, log_file=None)
+    log = get_logger("drun.cli")
+    try:
+        levels = parse_sweep(stream_sweep)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--stream-sweep")
+
+    env_file_path = env_file or ".env"
+    if env_file:
+        env_file_path, _, _ = _resolve_env_file_alias(env_file)
+    env_store = load_environment(os.environ.get("DRUN_ENV"), env_file_path)
+    global_vars: Dict[str, Any] = {}
+    for k2, v2 in parse_kv(vars).items():
+        global_vars[k2] = v2
+        global_vars[k2.lower()] = v2
+
+    try:
+        loaded, meta = load_yaml_file(Path(path))
+    except LoadError as exc:
+        log.error(str(exc))
+        raise typer.Exit(code=2)
+    cases = [c for c in loaded if case_name is None or c.config.name == case_name]
+    if not cases:
+        typer.echo(f"No case found in {path}" + (f" named {case_name!r}" if case_name else ""))
+        raise typer.Exit(code=2)
+    case = cases[0]
+    try:
+        step_index = find_stream_step(case, step)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--step")
+
+    funcs = get_functions_for(Path(meta.get("file", path)).resolve())
+    if not case.config.base_url and (base := global_vars.get("base_url") or env_store.get("BASE_URL") or env_store.get("base_url")):
+        case.config.base_url = str(base)
+    if case.config.base_url and ("{{" in case.config.base_url or "${" in case.config.base_url):
+        case.config.base_url = TemplateEngine().render_value(case.config.base_url, global_vars, funcs, envmap=env_store)
+    param_sets = expand_parameters(case.parameters, source_path=meta.get("file"))
+    params = param_sets[0] if param_sets else {}
+
+    runner = Runner(log=None, log_response_headers=False, retry_budget=None)
+    typer.echo(f"Stream sweep: case={case.config.name!r} step={case.steps[step_index].name!r} levels={levels}")
+    try:
+        result = run_stream_sweep(
+            runner,
+            case,
+            step_index,
+            levels,
+            requests_per_level=requests,
+            global_vars=global_vars,
+            params=params,
+            funcs=funcs,
+            envmap=env_store,
+            source=meta.get("file"),
+            knee_factor=knee_factor,
+        )
+    except RuntimeError as e:
+        typer.echo(f"[ERROR] {e}")
+        raise typer.Exit(code=1)
+
+    for line in format_sweep_table(result):
+        typer.echo(line)
+    knee = result["knee"]
+    if knee.get("concurrency") is not None:
+        typer.echo(f"Knee: concurrency={knee['concurrency']} (degrades at {knee['degraded_at']}: {knee['reason']})")
+    else:
+        typer.echo(f"Knee: not reached ({knee['reason']})")
+    if report:
+        Path(report).parent.mkdir(parents=True, exist_ok=True)
+        Path(report).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        typer.echo(f"Bench result written to {report}")
+
+
 @app.command("check")
 def check(
     path: str = typer.Argument(..., help="要验证的文件或目录"),
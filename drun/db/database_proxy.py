@@ -5,12 +5,15 @@ import logging
 import os
 import threading
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple
 from urllib.parse import urlparse
 
 from drun.utils.logging import get_logger
 from drun.utils.mask import mask_body
+from drun.utils.metrics import active_metrics
+from drun.utils.tracing import SPAN_KIND_CLIENT, trace_span
 
 
 # Local exceptions (exported via utils.errors in a follow-up for reuse)
@@ -474,34 +477,64 @@ class DatabaseRoleProxy:
             finally:
                 self._conn = None
 
-    def query(self, sql: str) -> Optional[Mapping[str, Any]]:
-        dn, conn = self._ensure_conn()
-        cur = _open_cursor(dn, conn)
+    @contextmanager
+    def _instrument(self, method: str, sql: str) -> Iterator[None]:
+        # Trace span (drun run --trace-out) and query-time metric (--metrics-out) when enabled
+        words = sql.split(None, 1)
+        operation = words[0].upper() if words else ""
         t0 = time.perf_counter()
         try:
-            cur.execute(sql)
-            row = cur.fetchone()
-            return row
+            with trace_span(
+                f"db.{method} {self.db_name}.{self.role_name}",
+                kind=SPAN_KIND_CLIENT,
+                attributes={
+                    "drun.span.type": "db",
+                    "db.system": "mysql",
+                    "db.namespace": self._cfg.dsn.get("database") or self.db_name,
+                    "db.operation.name": operation or None,
+                    "drun.db.role": self.role_name,
+                },
+            ):
+                yield
         finally:
+            metrics = active_metrics()
+            if metrics is not None:
+                metrics.observe(
+                    "drun_db_query_duration_seconds",
+                    {"db": self.db_name, "role": self.role_name, "operation": operation},
+                    time.perf_counter() - t0,
+                )
+
+    def query(self, sql: str) -> Optional[Mapping[str, Any]]:
+        with self._instrument("query", sql):
+            dn, conn = self._ensure_conn()
+            cur = _open_cursor(dn, conn)
+            t0 = time.perf_counter()
             try:
-                cur.close()
-            except Exception:
-                pass
-            self._query_ms_total += (time.perf_counter() - t0) * 1000.0
+                cur.execute(sql)
+                row = cur.fetchone()
+                return row
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+                self._query_ms_total += (time.perf_counter() - t0) * 1000.0
 
     def execute(self, sql: str) -> int:
-        dn, conn = self._ensure_conn()
-        cur = _open_cursor(dn, conn)
-        t0 = time.perf_counter()
-        try:
-            affected = cur.execute(sql)
-            return int(affected or 0)
-        finally:
+        with self._instrument("execute", sql):
+            dn, conn = self._ensure_conn()
+            cur = _open_cursor(dn, conn)
+            t0 = time.perf_counter()
             try:
-                cur.close()
-            except Exception:
-                pass
-            self._query_ms_total += (time.perf_counter() - t0) * 1000.0
+                affected = cur.execute(sql)
+                return int(affected or 0)
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+                self._query_ms_total += (time.perf_counter() - t0) * 1000.0
 
 
 class _DBNameAccessor:  # Kept for backward compatibility if referenced elsewhere
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import importlib
+import inspect
+import os
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from drun.utils.logging import get_logger
+
+# Host used when a case runs against an in-process app without a base_url
+DEFAULT_APP_BASE_URL = "http://testserver"
+
+_log = get_logger("drun.app")
+
+
+def load_app(spec: str) -> Any:
+    """Import ``"package.module:attr"`` (attr may be dotted, e.g. ``"main:api.app"``).
+
+    The current working directory is put on ``sys.path`` so project modules import the
+    same way ``uvicorn main:app`` would find them.
+    """
+    module_name, sep, attr = (spec or "").strip().partition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(f"Invalid app spec {spec!r}; expected 'module:attribute'")
+    cwd = os.getcwd()
+    if cwd not in sys.path:
+        sys.path.insert(0, cwd)
+    obj: Any = importlib.import_module(module_name)
+    for part in attr.split("."):
+        try:
+            obj = getattr(obj, part)
+        except AttributeError:
+            raise ValueError(f"App {spec!r}: module {module_name!r} has no attribute {attr!r}") from None
+    if not callable(obj):
+        raise ValueError(f"App {spec!r} is not callable")
+    return obj
+
+
+def is_asgi_app(app: Any) -> bool:
+    """ASGI apps are async callables; WSGI apps (Flask, Django WSGIHandler) are sync."""
+    if inspect.iscoroutinefunction(app):
+        return True
+    call = getattr(app, "__call__", None)
+    return call is not None and inspect.iscoroutinefunction(call)
+
+
+class _AsgiRunner:
+    """Event loop on a daemon thread that drives one ASGI app, including its lifespan."""
+
+    def __init__(self, app: Any, spec: str) -> None:
+        self.app = app
+        self.spec = spec
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="drun-asgi", daemon=True)
+        self._thread.start()
+        self._transport = self.call(self._make_transport())
+        self._lifespan_queue: Optional[asyncio.Queue] = None
+        self._lifespan_task: Optional[asyncio.Future] = None
+        self.call(self._startup())
+
+    def call(self, coro: Any) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _make_transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(app=self.app)
+
+    async def _startup(self) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        started: asyncio.Future = self.loop.create_future()
+
+        async def receive() -> Dict[str, Any]:
+            return await queue.get()
+
+        async def send(message: Dict[str, Any]) -> None:
+            kind = message.get("type")
+            if kind == "lifespan.startup.complete" and not started.done():
+                started.set_result(True)
+            elif kind == "lifespan.startup.failed" and not started.done():
+                started.set_exception(RuntimeError(message.get("message") or "lifespan startup failed"))
+
+        async def lifespan() -> None:
+            try:
+                await self.app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send)
+            except Exception:
+                # Apps without lifespan support raise on the unknown scope type
+                pass
+            finally:
+                if not started.done():
+                    started.set_result(False)
+
+        await queue.put({"type": "lifespan.startup"})
+        self._lifespan_queue = queue
+        self._lifespan_task = asyncio.ensure_future(lifespan())
+        if not await started:
+            self._lifespan_queue = None
+
+    async def _shutdown(self) -> None:
+        if self._lifespan_queue is not None and self._lifespan_task is not None:
+            await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+            try:
+                await asyncio.wait_for(self._lifespan_task, timeout=5.0)
+            except Exception:
+                pass
+
+    async def _handle(self, request: httpx.Request, content: bytes) -> httpx.Response:
+        areq = httpx.Request(
+            request.method,
+            request.url,
+            headers=request.headers,
+            content=content,
+            extensions=request.extensions,
+        )
+        resp = await self._transport.handle_async_request(areq)
+        body = await resp.aread()
+        # A stream (not content=) so the client still sees the body being read and closed
+        return httpx.Response(
+            resp.status_code, headers=resp.headers, stream=httpx.ByteStream(body), extensions=resp.extensions
+        )
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        return self.call(self._handle(request, request.read()))
+
+    def close(self) -> None:
+        try:
+            self.call(self._shutdown())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5.0)
+
+
+class SyncASGITransport(httpx.BaseTransport):
+    """Expose an ASGI app to the synchronous ``httpx.Client`` used by drun.
+
+    httpx's ``ASGITransport`` is async-only, so requests are handed to a shared event loop
+    thread. Responses are fully buffered (as with ``ASGITransport`` itself), so SSE
+    endpoints return all events once the app finishes the response.
+    """
+
+    def __init__(self, runner: _AsgiRunner) -> None:
+        self._runner = runner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._runner.handle(request)
+
+
+class _SharedWSGITransport(httpx.WSGITransport):
+    def close(self) -> None:
+        # Shared across clients; the app itself has nothing to release
+        pass
+
+
+_apps: Dict[str, Any] = {}
+_asgi_runners: Dict[str, _AsgiRunner] = {}
+_lock = threading.Lock()
+
+
+def app_transport(spec: str) -> httpx.BaseTransport:
+    """Return an in-process transport for the app at ``spec``.
+
+    The app is imported (and an ASGI app's lifespan started) once per run; every
+    ``HTTPClient`` gets a transport bound to that single instance.
+    """
+    with _lock:
+        app = _apps.get(spec)
+        if app is None:
+            app = _apps[spec] = load_app(spec)
+            _log.info(f"[APP] In-process {'ASGI' if is_asgi_app(app) else 'WSGI'} app: {spec}")
+        if is_asgi_app(app):
+            runner = _asgi_runners.get(spec)
+            if runner is None:
+                runner = _asgi_runners[spec] = _AsgiRunner(app, spec)
+            return SyncASGITransport(runner)
+        return _SharedWSGITransport(app=app)
+
+
+def shutdown_apps() -> None:
+    """Run ASGI lifespan shutdown and stop the event loop threads."""
+    with _lock:
+        runners = list(_asgi_runners.values())
+        _asgi_runners.clear()
+        _apps.clear()
+    for runner in runners:
+        try:
+            runner.close()
+        except Exception:
+            pass
+
+
+atexit.register(shutdown_apps)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from drun.utils.logging import get_logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstream-unavailable responses that count as failures in addition to transport errors
+DEFAULT_FAILURE_STATUSES = (502, 503, 504)
+
+_log = get_logger("drun.breaker")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the target host's circuit is open."""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"circuit open for host {host}; failing fast (next probe in {retry_in:.1f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Failure-ratio circuit breaker for a single host.
+
+    closed -> open: at least ``min_requests`` outcomes in the sliding window of the last
+    ``window`` requests and the failure ratio reaches ``failure_ratio``.
+    open -> half_open: after ``cooldown`` seconds one probe request is let through.
+    half_open -> closed on probe success, back to open on probe failure.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        failure_ratio: float = 0.5,
+        min_requests: int = 5,
+        window: int = 20,
+        cooldown: float = 30.0,
+    ) -> None:
+        self.host = host
+        self.failure_ratio = failure_ratio
+        self.min_requests = max(int(min_requests), 1)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_count = 0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=max(int(window), self.min_requests))
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.cooldown - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.host, remaining)
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                _log.info("[BREAKER] %s half-open: sending probe request", self.host)
+            # half-open: allow a single probe at a time
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, 0.0)
+            self._probe_in_flight = True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    _log.info("[BREAKER] %s closed: probe succeeded", self.host)
+                else:
+                    self._trip()
+                return
+            if self.state == OPEN:
+                return
+            self._outcomes.append(success)
+            total = len(self._outcomes)
+            failures = total - sum(1 for ok in self._outcomes if ok)
+            if total >= self.min_requests and failures / total >= self.failure_ratio:
+                self._trip()
+
+    def release(self) -> None:
+        """End a request that says nothing about the host (local error): frees a half-open probe slot."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened_count += 1
+        self._outcomes.clear()
+        _log.warning("[BREAKER] %s open: failing fast for %.1fs", self.host, self.cooldown)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "opened": self.opened_count, "rejected": self.rejected}
+
+
+class CircuitBreakerRegistry:
+    """Run-wide per-host circuit breakers shared by all HTTP clients."""
+
+    def __init__(
+        self,
+        *,
+        failure_ratio: float = 0.5,
+        min_requests: int = 5,
+        window: int = 20,
+        cooldown: float = 30.0,
+        failure_statuses: Iterable[int] = DEFAULT_FAILURE_STATUSES,
+    ) -> None:
+        self.failure_ratio = failure_ratio
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self.failure_statuses = set(int(x) for x in failure_statuses)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            br = self._breakers.get(host)
+            if br is None:
+                br = CircuitBreaker(
+                    host,
+                    failure_ratio=self.failure_ratio,
+                    min_requests=self.min_requests,
+                    window=self.window,
+                    cooldown=self.cooldown,
+                )
+                self._breakers[host] = br
+            return br
+
+    def is_failure_status(self, status_code: Optional[int]) -> bool:
+        return status_code in self.failure_statuses
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {br.host: br.stats() for br in breakers if br.opened_count or br.rejected}
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+INTERACTIONS_FILE = "interactions.jsonl"
+INDEX_FILE = "index.json"
+CASSETTE_VERSION = 1
+
+MATCH_FIELDS = ("method", "path", "query", "body")
+DEFAULT_MATCH: Tuple[str, ...] = MATCH_FIELDS
+# Match field -> key in a stored interaction ("body" on its own is the response body)
+_ENTRY_KEYS = {"method": "method", "path": "path", "query": "query", "body": "request_body"}
+
+
+class CassetteMiss(httpx.TransportError):
+    """No recorded interaction matches a request during replay."""
+
+
+def parse_match(value: Optional[str]) -> Tuple[str, ...]:
+    """Parse ``--replay-match`` (comma-separated subset of method,path,query,body)."""
+    if not value:
+        return DEFAULT_MATCH
+    fields = tuple(x.strip().lower() for x in value.split(",") if x.strip())
+    unknown = [f for f in fields if f not in MATCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown replay match field(s): {', '.join(unknown)}; expected: {', '.join(MATCH_FIELDS)}")
+    return fields
+
+
+def normalize_body(content: bytes) -> str:
+    """Digest of a request body; JSON bodies are canonicalized so key order does not matter."""
+    if not content:
+        return ""
+    try:
+        canonical = json.dumps(json.loads(content), sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        canonical = content
+    return hashlib.sha256(canonical).hexdigest()[:16]
+
+
+def _query(url: httpx.URL) -> str:
+    return "&".join(sorted(f"{k}={v}" for k, v in url.params.multi_items()))
+
+
+def _encode_body(raw: bytes) -> Dict[str, str]:
+    try:
+        return {"body": raw.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(raw).decode("ascii")}
+
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return str(entry.get("body") or "").encode("utf-8")
+
+
+class Cassette:
+    """Directory of recorded HTTP interactions.
+
+    Layout::
+
+        <dir>/interactions.jsonl   one interaction per line (request summary + raw response)
+        <dir>/index.json           "METHOD path" -> byte offsets into interactions.jsonl
+
+    The index is rebuilt from the JSONL file if it is missing or does not describe that
+    file (e.g. an interrupted re-record). On replay every interaction is parsed once and
+    grouped by its match key, so a lookup is a dict access whatever ``--replay-match`` is.
+    """
+
+    def __init__(self, directory: str | Path, mode: str, *, match: Sequence[str] = DEFAULT_MATCH) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode}")
+        self.dir = Path(directory)
+        self.mode = mode
+        self.match = tuple(match)
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[int]] = {}
+        self._cursor: Dict[Tuple[Any, ...], int] = {}
+        # Replay: match key -> interactions in recorded order
+        self._entries: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._fh = None
+        if mode == "record":
+            self.dir.mkdir(parents=True, exist_ok=True)
+            # A stale index would point into the truncated file if this run never reaches close()
+            (self.dir / INDEX_FILE).unlink(missing_ok=True)
+            self._fh = open(self.dir / INTERACTIONS_FILE, "wb")
+        else:
+            data_path = self.dir / INTERACTIONS_FILE
+            if not data_path.exists():
+                raise FileNotFoundError(f"Cassette not found: {data_path}")
+            data = data_path.read_bytes()
+            self._load_index(data)
+            for offset in sorted(o for group in self._index.values() for o in group):
+                entry = json.loads(data[offset:data.index(b"\n", offset)])
+                self._entries.setdefault(self._match_key(entry), []).append(entry)
+
+    # ---- keys ----
+    @staticmethod
+    def _index_key(method: str, path: str) -> str:
+        return f"{method.upper()} {path}"
+
+    def _match_key(self, entry: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(entry.get(_ENTRY_KEYS[f]) for f in self.match)
+
+    @staticmethod
+    def describe(request: httpx.Request, content: bytes) -> Dict[str, Any]:
+        return {
+            "method": request.method.upper(),
+            "path": request.url.path,
+            "query": _query(request.url),
+            "request_body": normalize_body(content),
+        }
+
+    # ---- record ----
+    def record(self, request: httpx.Request, request_content: bytes, response: httpx.Response, raw: bytes) -> None:
+        entry: Dict[str, Any] = {
+            "v": CASSETTE_VERSION,
+            **self.describe(request, request_content),
+            "url": str(request.url),
+            "status_code": response.status_code,
+            "headers": [[k, v] for k, v in response.headers.multi_items()],
+            **_encode_body(raw),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._fh is None:
+                return
+            offset = self._fh.tell()
+            self._fh.write(line)
+            self._fh.flush()
+            self._index.setdefault(self._index_key(entry["method"], entry["path"]), []).append(offset)
+            self.recorded += 1
+
+    # ---- replay ----
+    def _load_index(self, data: bytes) -> None:
+        index_path = self.dir / INDEX_FILE
+        if index_path.exists():
+            try:
+                obj = json.loads(index_path.read_text(encoding="utf-8"))
+                index = {k: [int(o) for o in v] for k, v in (obj.get("entries") or {}).items()}
+            except (ValueError, TypeError, AttributeError):
+                index = None
+            if index is not None and self._index_matches(index, obj.get("count"), data):
+                self._index = index
+                return
+        self._index = {}
+        offset = 0
+        for line in data.splitlines(keepends=True):
+            # A trailing line without newline was cut off mid-write
+            if line.strip() and line.endswith(b"\n"):
+                entry = json.loads(line)
+                self._index.setdefault(self._index_key(entry["method"], entry["path"]), []).append(offset)
+            offset += len(line)
+
+    @staticmethod
+    def _index_matches(index: Dict[str, List[int]], count: Any, data: bytes) -> bool:
+        """Whether ``index`` describes ``data``: one offset per line, each at a line start."""
+        offsets = [o for group in index.values() for o in group]
+        if count != len(offsets) or count != sum(1 for line in data.splitlines(keepends=True) if line.strip() and line.endswith(b"\n")):
+            return False
+        return all(0 <= o < len(data) and (o == 0 or data[o - 1:o] == b"\n") for o in offsets)
+
+    def lookup(self, request: httpx.Request, content: bytes) -> Dict[str, Any]:
+        desc = self.describe(request, content)
+        wanted = self._match_key(desc)
+        candidates = self._entries.get(wanted)
+        with self._lock:
+            if not candidates:
+                self.misses += 1
+                raise CassetteMiss(
+                    f"No recorded interaction for {desc['method']} {request.url} (match={','.join(self.match)}) in {self.dir}"
+                )
+            # Identical requests are replayed in recorded order; the last one repeats
+            pos = self._cursor.get(wanted, 0)
+            self._cursor[wanted] = pos + 1
+            self.replayed += 1
+        return candidates[min(pos, len(candidates) - 1)]
+
+    # ---- lifecycle ----
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.close()
+            self._fh = None
+            index = {"version": CASSETTE_VERSION, "count": self.recorded, "entries": self._index}
+            # Atomic write: a reader never sees a partial index
+            fd, tmp = tempfile.mkstemp(prefix=f".{INDEX_FILE}.", dir=str(self.dir))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(index, ensure_ascii=False))
+                os.replace(tmp, self.dir / INDEX_FILE)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "dir": str(self.dir),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+    def wrap(self, transport: httpx.BaseTransport) -> httpx.BaseTransport:
+        return RecordingTransport(transport, self)
+
+    def replay_transport(self) -> httpx.BaseTransport:
+        return ReplayTransport(self)
+
+
+class _TeeStream(httpx.SyncByteStream):
+    """Pass response chunks through unchanged while keeping a copy for the cassette."""
+
+    def __init__(self, inner: Any, on_close: Callable[[bytes], None]) -> None:
+        self._inner = inner
+        self._chunks: List[bytes] = []
+        self._on_close = on_close
+        self._done = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._inner:
+            self._chunks.append(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._inner, "close", None)
+            if close is not None:
+                close()
+        finally:
+            if not self._done:
+                self._done = True
+                self._on_close(b"".join(self._chunks))
+
+
+class RecordingTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport, cassette: Cassette) -> None:
+        self._inner = inner
+        self._cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        content = request.read()
+        response = self._inner.handle_request(request)
+
+        def _save(raw: bytes) -> None:
+            self._cassette.record(request, content, response, raw)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TeeStream(response.stream, _save),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    def __init__(self, cassette: Cassette) -> None:
+        self._cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._cassette.lookup(request, request.read())
+        return httpx.Response(
+            status_code=int(entry.get("status_code") or 200),
+            headers=[(k, v) for k, v in entry.get("headers") or []],
+            stream=httpx.ByteStream(_decode_body(entry)),
+            request=request,
+        )
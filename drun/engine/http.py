@@ -1,116 +1,263 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, List, Mapping, Sequence, Tuple
 import httpx
 import json
 import time
 
+from drun.engine.app_transport import app_transport
+from drun.engine.breaker import CircuitBreakerRegistry
+from drun.engine.cassette import Cassette, CassetteMiss
+from drun.engine.ratelimit import RateLimiter, TokenBucket
+from drun.engine.record_stream import RECORD_STREAM_FORMATS, parse_record_stream
+from drun.engine.payloads import compress_body, encode_form_data, encode_json_body
+from drun.engine.response import LazyBody, loads_json
+from drun.engine.server_timing import server_timings
+from drun.engine.spool import DEFAULT_PREFIX_BYTES, SpooledBody, digest_content, digest_stream, read_capped
+from drun.engine.stream_metrics import StreamMetrics
+from drun.engine.transport import install_timing_backend, parse_resolve, record_timings
+from drun.engine.uploads import UploadPlan, upload_stats
+from drun.templating.engine import compile_expression
+
 
 class HTTPClient:
-    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None, verify: Optional[bool] = None, headers: Optional[Dict[str, str]] = None) -> None:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        verify: Optional[bool] = None,
+        headers: Optional[Dict[str, str]] = None,
+        *,
+        breakers: Optional[CircuitBreakerRegistry] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        case_rate_limit: Optional[Tuple[str, TokenBucket]] = None,
+        cassette: Optional[Cassette] = None,
+        app: Optional[str] = None,
+        uds: Optional[str] = None,
+        resolve: Optional[Mapping[str, str]] = None,
+        max_body_bytes: Optional[int] = None,
+        spool_to_disk: bool = False,
+        latency_headers: Optional[Sequence[str]] = None,
+        base_dir: Optional[str] = None,
+    ) -> None:
         self.base_url = base_url or ""
+        # Bodies above max_body_bytes are not kept in memory (see drun.engine.spool)
+        self.max_body_bytes = max_body_bytes
+        self.spool_to_disk = spool_to_disk
+        # Backend latency headers parsed next to Server-Timing (None: the defaults)
+        self.latency_headers = latency_headers
+        # Directory of the case file: files / body_file paths are relative to it
+        self.base_dir = base_dir
         self.timeout = timeout
         self.verify = verify
         self.headers = headers or {}
+        # Run-wide per-host circuit breakers (optional)
+        self.breakers = breakers
+        self.rate_limiter = rate_limiter
+        # (host, bucket) of the case's config.rate_limit, applied on top of the run-wide limit
+        self.case_rate_limit = case_rate_limit
         event_hooks: Dict[str, list] = {}
-        # httpstat 功能已移除，保留空 hooks
+        # Connection-level timings (httpstat): DNS via the transport's network backend,
+        # the remaining phases via httpx's "trace" request extension.
+
+        client_kwargs: Dict[str, Any] = {}
+        if cassette is not None and cassette.mode == "replay":
+            # Offline: an explicit transport also bypasses proxies from the environment
+            client_kwargs["transport"] = cassette.replay_transport()
+        elif app:
+            # Requests go straight to the ASGI/WSGI app in this process (no sockets)
+            client_kwargs["transport"] = app_transport(app)
+        elif uds or resolve:
+            # Connect directly (no env proxies): through a Unix socket and/or to pinned addresses
+            client_kwargs["transport"] = httpx.HTTPTransport(
+                verify=self.verify if self.verify is not None else True,
+                uds=uds or None,
+            )
 
         self.client = httpx.Client(
             base_url=self.base_url or None,
             timeout=self.timeout or 10.0,
             verify=self.verify if self.verify is not None else True,
             headers=self.headers,
-            event_hooks=event_hooks
+            event_hooks=event_hooks,
+            **client_kwargs,
         )
+        install_timing_backend(self.client, resolve=parse_resolve(resolve))
+        if cassette is not None and cassette.mode == "record":
+            # Tee every response (including SSE streams) into the cassette
+            self.client._transport = cassette.wrap(self.client._transport)
+            self.client._mounts = {
+                pattern: (cassette.wrap(t) if t is not None else None)
+                for pattern, t in self.client._mounts.items()
+            }
 
     def close(self) -> None:
         self.client.close()
 
-    def _parse_sse_stream(self, response: httpx.Response, start_time: float) -> Dict[str, Any]:
-        """Parse Server-Sent Events (SSE) stream"""
-        events: List[Dict[str, Any]] = []
+    def _host_for(self, path: str) -> str:
+        try:
+            url = httpx.URL(path)
+            if not url.host and self.base_url:
+                url = httpx.URL(self.base_url)
+            return url.netloc.decode("ascii", errors="replace") or "-"
+        except Exception:
+            return "-"
+
+    def _parse_sse_stream(
+        self,
+        response: httpx.Response,
+        start_time: float,
+        *,
+        max_events: Optional[int] = None,
+        keep_raw: Any = True,
+        stop_when: Optional[str] = None,
+        headers_ms: float = 0.0,
+        stall_threshold_ms: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Parse Server-Sent Events (SSE) stream
+
+        Memory stays bounded for long streams: ``max_events`` keeps only the most recent
+        events (ring buffer, ``index`` stays absolute), ``keep_raw`` limits the raw lines
+        kept (true / false / first N), and ``stop_when`` closes the stream as soon as the
+        expression is true. The summary always describes the whole stream as read,
+        including latency metrics (TTFT, inter-event gap percentiles, rates, stalls)
+        computed incrementally while parsing.
+        """
+        events: Deque[Dict[str, Any]] = deque(maxlen=max_events if max_events and max_events > 0 else None)
         raw_chunks: List[str] = []
-        
+        if keep_raw is True:
+            raw_limit: Optional[int] = None
+        elif keep_raw is False or keep_raw is None:
+            raw_limit = 0
+        else:
+            raw_limit = max(int(keep_raw), 0)
+        raw_lines = 0
+        predicate = compile_expression(stop_when) if stop_when else None
+        event_count = 0
+        first_ms: Optional[float] = None
+        last_ms = 0.0
+        stop_reason: Optional[str] = None
+        metrics = StreamMetrics(headers_ms=headers_ms, stall_threshold_ms=stall_threshold_ms)
+
+        def _add(fields: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal event_count, first_ms, last_ms
+            event = {"index": event_count, **fields}
+            events.append(event)
+            event_count += 1
+            if first_ms is None:
+                first_ms = event["timestamp_ms"]
+            last_ms = event["timestamp_ms"]
+            return event
+
         try:
-            with response:
-                current_event: Dict[str, Any] = {}
-                current_data_lines: List[str] = []
-                
-                for line in response.iter_lines():
-                    current_time_ms = (time.perf_counter() - start_time) * 1000.0
+            current_event: Dict[str, Any] = {}
+            current_data_lines: List[str] = []
+            
+            for line in response.iter_lines():
+                current_time_ms = (time.perf_counter() - start_time) * 1000.0
+                raw_lines += 1
+                if raw_limit is None or len(raw_chunks) < raw_limit:
                     raw_chunks.append(line + "\n")
-                    
-                    # Empty line marks end of event
-                    if not line or line.strip() == "":
-                        if current_data_lines:
-                            # Join data lines and try to parse as JSON
-                            data_str = "\n".join(current_data_lines)
-                            
-                            # Handle [DONE] marker
-                            if data_str.strip() == "[DONE]":
-                                events.append({
-                                    "index": len(events),
-                                    "timestamp_ms": current_time_ms,
-                                    "event": current_event.get("event", "done"),
-                                    "data": None
-                                })
-                            else:
-                                # Try to parse as JSON
-                                try:
-                                    data_obj = json.loads(data_str)
-                                except json.JSONDecodeError:
-                                    data_obj = data_str
-                                
-                                events.append({
-                                    "index": len(events),
-                                    "timestamp_ms": current_time_ms,
-                                    "event": current_event.get("event", "message"),
-                                    "data": data_obj
-                                })
+                
+                # Empty line marks end of event
+                if not line or line.strip() == "":
+                    if current_data_lines:
+                        # Join data lines and try to parse as JSON
+                        data_str = "\n".join(current_data_lines)
+                        
+                        # Handle [DONE] marker
+                        if data_str.strip() == "[DONE]":
+                            event = {
+                                "timestamp_ms": current_time_ms,
+                                "event": current_event.get("event", "done"),
+                                "data": None
+                            }
+                        else:
+                            # Try to parse as JSON
+                            try:
+                                data_obj = loads_json(data_str)
+                            except json.JSONDecodeError:
+                                data_obj = data_str
                             
-                            # Reset for next event
-                            current_event = {}
-                            current_data_lines = []
-                        continue
-                    
-                    # Parse SSE fields
-                    if ":" in line:
-                        field, _, value = line.partition(":")
-                        field = field.strip()
-                        value = value.lstrip()
+                            event = {
+                                "timestamp_ms": current_time_ms,
+                                "event": current_event.get("event", "message"),
+                                "data": data_obj
+                            }
+                        event = _add(event)
+                        metrics.on_event(current_time_ms)
                         
-                        if field == "data":
-                            current_data_lines.append(value)
-                        elif field == "event":
-                            current_event["event"] = value
-                        elif field == "id":
-                            current_event["id"] = value
-                        elif field == "retry":
-                            current_event["retry"] = value
+                        # Reset for next event
+                        current_event = {}
+                        current_data_lines = []
+
+                        if predicate is not None:
+                            ctx = {
+                                "event": event,
+                                "data": event["data"],
+                                "event_type": event["event"],
+                                "event_count": event_count,
+                                "elapsed_ms": current_time_ms,
+                            }
+                            try:
+                                matched = bool(predicate(ctx))
+                            except Exception:
+                                matched = False
+                            if matched:
+                                stop_reason = "stop_when"
+                                break
+                    continue
+                
+                # Parse SSE fields
+                if ":" in line:
+                    field, _, value = line.partition(":")
+                    field = field.strip()
+                    value = value.lstrip()
+                    
+                    if field == "data":
+                        current_data_lines.append(value)
+                    elif field == "event":
+                        current_event["event"] = value
+                    elif field == "id":
+                        current_event["id"] = value
+                    elif field == "retry":
+                        current_event["retry"] = value
         
         except Exception as e:
             # Add error event if stream parsing fails
-            events.append({
-                "index": len(events),
+            _add({
                 "timestamp_ms": (time.perf_counter() - start_time) * 1000.0,
                 "event": "error",
                 "data": {"error": str(e)}
             })
+        finally:
+            # Also stops the download when the loop exits early (stop_when)
+            response.close()
+        duration_ms = (time.perf_counter() - start_time) * 1000.0
         
         # Calculate summary
-        summary = {
-            "event_count": len(events),
-            "first_chunk_ms": events[0]["timestamp_ms"] if events else 0,
-            "last_chunk_ms": events[-1]["timestamp_ms"] if events else 0
+        summary: Dict[str, Any] = {
+            "event_count": event_count,
+            "first_chunk_ms": first_ms if first_ms is not None else 0,
+            "last_chunk_ms": last_ms,
+            "events_kept": len(events),
+            "raw_lines": raw_lines,
+            "stopped_early": stop_reason is not None,
         }
+        if stop_reason:
+            summary["stop_reason"] = stop_reason
+        summary.update(metrics.summary(duration_ms, response.num_bytes_downloaded))
         
         return {
-            "stream_events": events,
+            "stream_events": list(events),
             "stream_raw_chunks": raw_chunks,
-            "stream_summary": summary
+            "stream_summary": summary,
+            # Mergeable gap histogram (the summary only has this stream's percentiles)
+            "stream_gaps": metrics.gaps,
         }
 
-    def request(self, req: Dict[str, Any]) -> Dict[str, Any]:
+    def request(self, req: Dict[str, Any], *, on_record: Optional[Callable[[int, Any], None]] = None) -> Dict[str, Any]:
         method = req.get("method", "GET")
         path = req.get("path", "")
         # Ensure path is not None or empty when no base_url
@@ -126,10 +273,22 @@ class HTTPClient:
         verify = req.get("verify", self.verify)
         allow_redirects = req.get("allow_redirects", True)
         auth = req.get("auth")
+        max_body_bytes = req.get("max_body_bytes", self.max_body_bytes)
+        spool_to_disk = bool(req.get("spool_to_disk", self.spool_to_disk))
+        download = req.get("download")
         
-        # Check if streaming mode is enabled
-        is_stream = req.get("stream", False)
+        # Check if streaming mode is enabled: true/"sse" for SSE, or a record format (ndjson / json_array)
+        stream_mode = req.get("stream", False)
+        is_stream = bool(stream_mode)
         stream_timeout = req.get("stream_timeout", 30.0)
+        stream_options: Dict[str, Any] = {
+            "stop_when": req.get("stop_when"),
+            "stall_threshold_ms": req.get("stall_threshold_ms"),
+        }
+        if stream_mode in RECORD_STREAM_FORMATS:
+            stream_options.update(fmt=stream_mode, sample_records=req.get("sample_records"), on_record=on_record)
+        else:
+            stream_options.update(max_events=req.get("max_events"), keep_raw=req.get("keep_raw", True))
 
         # auth support: basic, bearer
         if auth and isinstance(auth, dict):
@@ -146,6 +305,118 @@ class HTTPClient:
         else:
             auth_tuple = None
 
+        # files: {field: {path: ...}} / body_file: stream from disk instead of memory
+        body_file = req.get("body_file")
+        body_generate = req.get("body_generate")
+        if body_file is not None and body_generate is not None:
+            raise ValueError("body_file and body_generate are mutually exclusive")
+        if (body_file is not None or body_generate is not None) and (json_data is not None or data is not None):
+            raise ValueError("body_file / body_generate cannot be combined with body or data")
+        compress = req.get("compress")
+        # Pre-encoded body bytes: static bodies cached by the runner, or compressed on the fly
+        encoded_body = req.get("encoded_body")
+        if compress and (body_file is not None or body_generate is not None or files):
+            raise ValueError("compress applies to body or data only")
+        if encoded_body is None and compress and (json_data is not None or data is not None):
+            raw = encode_json_body(json_data) if json_data is not None else encode_form_data(data)
+            encoded_body = compress_body(raw, compress)
+        if encoded_body is not None:
+            extra: Dict[str, str] = {}
+            if json_data is not None:
+                extra["Content-Type"] = "application/json"
+            elif isinstance(data, dict):
+                extra["Content-Type"] = "application/x-www-form-urlencoded"
+            if compress:
+                extra["Content-Encoding"] = compress
+            lowered = {k.lower() for k in headers}
+            headers = {**{k: v for k, v in extra.items() if k.lower() not in lowered}, **headers}
+            json_data = data = None
+        uploads = UploadPlan(files, body_file, body_generate, base_dir=self.base_dir)
+        if uploads.headers:
+            lowered = {k.lower() for k in headers}
+            headers = {**{k: v for k, v in uploads.headers.items() if k.lower() not in lowered}, **headers}
+
+        # Validation, encoding and upload setup are done: only now may the breaker admit
+        # the request (a half-open probe must always be released by record() / release() below)
+        host = self._host_for(path)
+        breaker = self.breakers.get(host) if self.breakers is not None else None
+        if breaker is not None:
+            try:
+                # Raises CircuitOpenError without touching the network while the host is open
+                breaker.before_request()
+            except BaseException:
+                uploads.close()
+                raise
+        try:
+            case_bucket = self.case_rate_limit[1] if self.case_rate_limit and self.case_rate_limit[0] == host else None
+            throttle_ms = self.rate_limiter.acquire(host, case_bucket) * 1000.0 if self.rate_limiter is not None else 0.0
+            with record_timings() as recorder:
+                result = self._send(
+                    method=method,
+                    path=path,
+                    params=params,
+                    headers=headers,
+                    json_data=json_data,
+                    data=data,
+                    files=uploads.files,
+                    content=uploads.content if uploads.content is not None else encoded_body,
+                    timeout=timeout,
+                    allow_redirects=allow_redirects,
+                    auth_tuple=auth_tuple,
+                    is_stream=is_stream,
+                    stream_timeout=stream_timeout,
+                    stream_options=stream_options,
+                    body_cap=(max_body_bytes, spool_to_disk) if max_body_bytes is not None or spool_to_disk else None,
+                    download=download,
+                    extensions={"trace": recorder.trace},
+                )
+        except BaseException as e:
+            if breaker is not None:
+                # Only transport errors (connect/read failures, timeouts) count against the host;
+                # local errors, cassette misses and interrupts just release a half-open probe
+                if isinstance(e, httpx.TransportError) and not isinstance(e, CassetteMiss):
+                    breaker.record(False)
+                else:
+                    breaker.release()
+            raise
+        finally:
+            uploads.close()
+        if breaker is not None:
+            breaker.record(not self.breakers.is_failure_status(result.get("status_code")))  # type: ignore[union-attr]
+        result["httpstat"] = recorder.result()
+        st = server_timings(result.get("headers"), self.latency_headers)
+        if st:
+            result["server_timing"] = st
+        if throttle_ms:
+            result.setdefault("timings", {})["throttle"] = throttle_ms
+        if uploads.active:
+            result["upload"] = upload_stats(uploads, result["httpstat"], result.get("timings") or {})
+        if uploads.generated is not None:
+            # Digest of what was actually sent, without keeping the payload
+            result["generated"] = uploads.generated.describe()
+        return result
+
+    def _send(
+        self,
+        *,
+        method: str,
+        path: str,
+        params: Any,
+        headers: Dict[str, Any],
+        json_data: Any,
+        data: Any,
+        files: Any,
+        timeout: Any,
+        content: Any = None,
+        allow_redirects: Any,
+        auth_tuple: Any,
+        is_stream: bool,
+        stream_timeout: Any,
+        extensions: Dict[str, Any],
+        stream_options: Optional[Dict[str, Any]] = None,
+        body_cap: Optional[tuple] = None,
+        download: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         # Handle streaming requests
         if is_stream:
             start_time = time.perf_counter()
@@ -161,28 +432,43 @@ class HTTPClient:
                 json=json_data,
                 data=data,
                 files=files,
+                content=content,
                 timeout=actual_timeout,
                 follow_redirects=bool(allow_redirects),
                 auth=auth_tuple,
+                extensions=extensions,
             ) as resp:
-                elapsed_ms = (time.perf_counter() - start_time) * 1000.0
+                headers_ms = (time.perf_counter() - start_time) * 1000.0
                 
-                # Parse SSE stream
-                stream_data = self._parse_sse_stream(resp, start_time)
+                options = dict(stream_options or {})
+                if options.get("fmt"):
+                    # NDJSON / JSON array: parsed record by record
+                    stream_data = parse_record_stream(resp, start_time, options.pop("fmt"), headers_ms=headers_ms, **options)
+                    stream_data["stream_format"] = stream_data["stream_summary"]["format"]
+                    # The kept sample doubles as the body so $[0].id style checks work
+                    stream_data["body"] = stream_data["stream_records"]
+                else:
+                    # Parse SSE stream
+                    stream_data = self._parse_sse_stream(resp, start_time, headers_ms=headers_ms, **options)
+                # elapsed covers the whole stream; headers_ms is when the response started
+                elapsed_ms = (time.perf_counter() - start_time) * 1000.0
                 
                 result = {
                     "status_code": resp.status_code,
                     "headers": dict(resp.headers),
                     "is_stream": True,
                     "elapsed_ms": elapsed_ms,
+                    "headers_ms": headers_ms,
                     "url": str(resp.url),
                     "method": method,
+                    "timings": {"ttfb": headers_ms, "body_read": elapsed_ms - headers_ms},
                 }
                 result.update(stream_data)
                 return result
         
-        # Non-streaming request (original behavior)
-        resp = self.client.request(
+        # Non-streaming request: send and read separately so that time-to-first-byte
+        # (headers received) and body download can be reported as distinct phases.
+        request = self.client.build_request(
             method=method,
             url=path,
             params=params,
@@ -190,27 +476,55 @@ class HTTPClient:
             json=json_data,
             data=data,
             files=files,
+            content=content,
             timeout=timeout,
-            follow_redirects=bool(allow_redirects),
+            extensions=extensions,
+        )
+        start_time = time.perf_counter()
+        resp = self.client.send(
+            request,
             auth=auth_tuple,
+            follow_redirects=bool(allow_redirects),
+            stream=True,
         )
-
-        body_text: Optional[str] = None
-        body_json: Any = None
+        ttfb_ms = (time.perf_counter() - start_time) * 1000.0
+        capped: Any = None
+        digest: Optional[Dict[str, Any]] = None
+        prefix_bytes = int((download or {}).get("prefix_bytes") or DEFAULT_PREFIX_BYTES)
         try:
-            body_json = resp.json()
-        except Exception:
-            try:
-                body_text = resp.text
-            except Exception:
-                body_text = None
+            if download is not None and download.get("discard", True):
+                # Verify-only download: hash/count chunks as they arrive, keep nothing
+                digest = digest_stream(resp, prefix_bytes)
+            elif body_cap is not None and download is None:
+                # Large bodies stream to a temp file (or are dropped) instead of memory
+                capped = read_capped(resp, *body_cap)
+            else:
+                resp.read()
+        finally:
+            resp.close()
+        body_read_ms = (time.perf_counter() - start_time) * 1000.0 - ttfb_ms
+
+        body: Any
+        if digest is not None:
+            body = None
+        elif isinstance(capped, SpooledBody):
+            body = capped  # JSON parsed lazily, only if an extract/validator needs it
+        elif capped is not None:
+            body = LazyBody(capped, resp.charset_encoding)
+        else:
+            # Decoded once, on first use (JSON via orjson when installed, else text)
+            body = LazyBody(resp.content, resp.encoding)
 
         result = {
             "status_code": resp.status_code,
-            "headers": dict(resp.headers),
-            "body": body_json if body_json is not None else body_text,
+            # Case-insensitive httpx.Headers; converted to a dict only for logs/reports
+            "headers": resp.headers,
+            "body": body,
             "elapsed_ms": resp.elapsed.total_seconds() * 1000.0 if resp.elapsed else None,
             "url": str(resp.request.url),
             "method": str(resp.request.method),
+            "timings": {"ttfb": ttfb_ms, "body_read": body_read_ms},
         }
+        if download is not None:
+            result["download"] = digest if digest is not None else digest_content(resp, prefix_bytes)
         return result
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import random
+import re
+import zlib
+from typing import Any, Dict, Iterator, Optional, Union
+from urllib.parse import urlencode
+
+PAYLOAD_PATTERNS = ("random", "zeros", "json_array")
+# compress: values (sent as Content-Encoding)
+COMPRESSIONS = ("gzip", "deflate")
+# Bytes produced per chunk handed to the transport
+PAYLOAD_CHUNK_SIZE = 1024 * 1024
+
+_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "kib": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "mib": 1024 ** 2,
+          "g": 1024 ** 3, "gb": 1024 ** 3, "gib": 1024 ** 3}
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$")
+
+
+def parse_size(value: Union[int, str]) -> int:
+    """``256MB`` / ``1.5g`` / ``4096`` -> bytes (binary multiples: 1MB = 1024*1024)."""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid size {value!r}")
+    if isinstance(value, int):
+        n = value
+    else:
+        m = _SIZE_RE.match(str(value))
+        if not m or m.group(2).lower() not in _UNITS:
+            raise ValueError(f"Invalid size {value!r}; expected e.g. 4096, 512KB, 256MB, 1GB")
+        n = int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+    if n < 0:
+        raise ValueError(f"Size must be >= 0, got {value!r}")
+    return n
+
+
+class GeneratedBody:
+    """Deterministic synthetic request body produced chunk by chunk.
+
+    The same ``(size, pattern, seed)`` always yields the same bytes, and the sha256 is
+    computed while the body is sent, so nothing larger than one chunk is held in memory.
+    Re-iterable: each iteration (retry, redirect) regenerates the body from the seed.
+    """
+
+    def __init__(self, size: int, pattern: str = "random", seed: int = 0) -> None:
+        if pattern not in PAYLOAD_PATTERNS:
+            raise ValueError(f"Invalid body_generate pattern {pattern!r}; expected one of {', '.join(PAYLOAD_PATTERNS)}")
+        if pattern == "json_array" and size < 2:
+            raise ValueError("body_generate json_array needs size >= 2 (\"[]\")")
+        self.size = size
+        self.pattern = pattern
+        self.seed = seed
+        self._sha256: Optional[str] = None
+
+    @property
+    def content_type(self) -> str:
+        return "application/json" if self.pattern == "json_array" else "application/octet-stream"
+
+    def __iter__(self) -> Iterator[bytes]:
+        hasher = hashlib.sha256()
+        self._sha256 = None
+        for chunk in self._chunks():
+            hasher.update(chunk)
+            yield chunk
+        self._sha256 = hasher.hexdigest()
+
+    def _chunks(self) -> Iterator[bytes]:
+        if self.pattern == "zeros":
+            zero = bytes(PAYLOAD_CHUNK_SIZE)
+            remaining = self.size
+            while remaining > 0:
+                n = min(remaining, PAYLOAD_CHUNK_SIZE)
+                yield zero if n == PAYLOAD_CHUNK_SIZE else zero[:n]
+                remaining -= n
+        elif self.pattern == "random":
+            rng = random.Random(self.seed)
+            remaining = self.size
+            while remaining > 0:
+                n = min(remaining, PAYLOAD_CHUNK_SIZE)
+                yield rng.randbytes(n)
+                remaining -= n
+        else:
+            yield from self._json_array_chunks()
+
+    def _json_array_chunks(self) -> Iterator[bytes]:
+        # [{"id":0,"v":"<hex>"},...] padded with whitespace before "]" to hit the exact size
+        rng = random.Random(self.seed)
+        buf = bytearray(b"[")
+        emitted = 0
+        budget = self.size - 1  # reserve the closing bracket
+        i = 0
+        while True:
+            item = json.dumps({"id": i, "v": "%016x" % rng.getrandbits(64)}, separators=(",", ":")).encode()
+            if i:
+                item = b"," + item
+            if emitted + len(buf) + len(item) > budget:
+                break
+            buf += item
+            i += 1
+            if len(buf) >= PAYLOAD_CHUNK_SIZE:
+                emitted += len(buf)
+                yield bytes(buf)
+                buf = bytearray()
+        buf += b" " * (budget - emitted - len(buf)) + b"]"
+        yield bytes(buf)
+
+    def describe(self) -> Dict[str, Any]:
+        """Size/pattern/seed and, once the body was sent, its sha256."""
+        return {"size": self.size, "pattern": self.pattern, "seed": self.seed, "sha256": self._sha256}
+
+
+def build_generated_body(spec: Dict[str, Any]) -> GeneratedBody:
+    return GeneratedBody(parse_size(spec.get("size", 0)), str(spec.get("pattern") or "random"), int(spec.get("seed") or 0))
+
+
+def encode_json_body(body: Any) -> bytes:
+    """Serialize a ``body`` the way httpx does for ``json=`` (compact, UTF-8)."""
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def encode_form_data(data: Any) -> bytes:
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return urlencode(data, doseq=True).encode("utf-8")
+
+
+def compress_body(payload: bytes, method: str) -> bytes:
+    """gzip (deterministic: mtime=0, so identical bodies compress identically) or deflate (zlib)."""
+    if method == "gzip":
+        return gzip.compress(payload, mtime=0)
+    if method == "deflate":
+        return zlib.compress(payload)
+    raise ValueError(f"Invalid compress {method!r}; expected one of {', '.join(COMPRESSIONS)}")
+
+
+def has_placeholders(value: Any) -> bool:
+    """True when any string inside ``value`` could be a template (contains ``$``)."""
+    if isinstance(value, str):
+        return "$" in value
+    if isinstance(value, dict):
+        return any(has_placeholders(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(has_placeholders(v) for v in value)
+    return False
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    ``reserve()`` takes a token immediately (the balance may go negative) and returns how
+    long the caller has to wait for it, so concurrent callers queue up in arrival order and
+    the lock is never held while sleeping.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate limit must be > 0 requests/sec, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+def _parse_limit(value: Any) -> Tuple[float, Optional[float]]:
+    """Accept ``10`` or ``{rps: 10, burst: 20}``."""
+    if isinstance(value, Mapping):
+        rps = value.get("rps")
+        burst = value.get("burst")
+        return float(rps), (float(burst) if burst is not None else None)  # type: ignore[arg-type]
+    return float(value), None
+
+
+class RateLimiter:
+    """Run-wide per-host request rate limits shared by every HTTP client.
+
+    Lookup order for a request to ``host:port``: exact ``host:port`` entry, then ``host``,
+    then the ``*`` wildcard (set by ``--rps`` or the env file). Hosts without any limit
+    are not throttled. A case's ``config.rate_limit`` gets its own bucket (see
+    ``case_bucket``) that is checked together with the run-wide one, so it never changes
+    the limit other cases see.
+    """
+
+    def __init__(self, default_rps: Optional[float] = None, host_limits: Optional[Mapping[str, Any]] = None) -> None:
+        self._limits: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Buckets of case-level limits, keyed by the caller (one per case and host)
+        self._case_buckets: Dict[Any, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.wait_seconds = 0.0
+        self.throttled = 0
+        for host, value in (host_limits or {}).items():
+            self.set_limit(str(host), *_parse_limit(value))
+        if default_rps:
+            # --rps on the command line wins over a "*" entry from the env file
+            self._limits["*"] = (float(default_rps), None)
+
+    def set_limit(self, host: str, rps: float, burst: Optional[float] = None) -> None:
+        with self._lock:
+            self._limits[host] = (float(rps), burst)
+            self._buckets.pop(host, None)
+
+    def _lookup(self, netloc: str) -> Optional[str]:
+        hostname = netloc.rsplit(":", 1)[0] if netloc.count(":") == 1 else netloc
+        for key in (netloc, hostname, "*"):
+            if key in self._limits:
+                return key
+        return None
+
+    def _bucket_for(self, netloc: str) -> Optional[TokenBucket]:
+        with self._lock:
+            key = self._lookup(netloc)
+            if key is None:
+                return None
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rps, burst = self._limits[key]
+                bucket = self._buckets[key] = TokenBucket(rps, burst)
+            return bucket
+
+    def case_bucket(self, key: Any, rps: float) -> TokenBucket:
+        """Bucket of one case-level limit, shared by every instance of that case."""
+        with self._lock:
+            bucket = self._case_buckets.get(key)
+            if bucket is None:
+                bucket = self._case_buckets[key] = TokenBucket(rps)
+            return bucket
+
+    def acquire(self, netloc: str, case_bucket: Optional[TokenBucket] = None) -> float:
+        """Block until a request to ``netloc`` may be sent; returns seconds waited.
+
+        With ``case_bucket`` the request needs a token from both the run-wide bucket of
+        the host and the case bucket, i.e. the stricter of the two limits applies.
+        """
+        buckets = [b for b in (self._bucket_for(netloc), case_bucket) if b is not None]
+        if not buckets:
+            return 0.0
+        wait = max(b.reserve() for b in buckets)
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.wait_seconds += wait
+                self.throttled += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "throttle_wait_ms": round(self.wait_seconds * 1000.0, 3),
+                "throttled_requests": self.throttled,
+                "limits": {k: v[0] for k, v in self._limits.items()},
+                "case_limits": sorted({b.rate for b in self._case_buckets.values()}),
+            }
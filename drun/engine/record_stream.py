@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from drun.engine.response import loads_json
+from drun.engine.stream_metrics import StreamMetrics
+from drun.templating.engine import compile_expression
+
+# stream: values handled here (stream: true / "sse" is Server-Sent Events)
+RECORD_STREAM_FORMATS = ("ndjson", "json_array")
+
+DEFAULT_SAMPLE_RECORDS = 100
+
+_WS = " \t\r\n"
+
+
+def iter_ndjson(lines: Iterable[str], on_error: Callable[[int, str], None]) -> Iterator[Any]:
+    """Yield one JSON value per non-empty line; undecodable lines go to ``on_error(line_no, msg)``."""
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            yield loads_json(text)
+        except json.JSONDecodeError as e:
+            on_error(line_no, str(e))
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array as text chunks arrive.
+
+    Only the current (incomplete) element is buffered, so arbitrarily long arrays are
+    processed in constant memory per record.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"Expected a JSON array, got {buf[pos:pos + 20]!r}")
+                started = True
+                pos += 1
+                continue
+            ch = buf[pos]
+            if ch == ",":
+                pos += 1
+                continue
+            if ch == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+            if not isinstance(obj, (dict, list, str)) and (end == len(buf) or buf[end] not in _WS + ",]"):
+                break  # a bare number may still continue (e.g. "12" + "34", "-4." + "5")
+            yield obj
+            pos = end
+    rest = buf[pos:].strip(_WS)
+    if rest and rest != "]":
+        raise ValueError(f"Truncated JSON array near {rest[:40]!r}")
+
+
+def parse_record_stream(
+    response: httpx.Response,
+    start_time: float,
+    fmt: str,
+    *,
+    headers_ms: float = 0.0,
+    sample_records: Optional[int] = None,
+    stop_when: Optional[str] = None,
+    on_record: Optional[Callable[[int, Any], None]] = None,
+    stall_threshold_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Parse an NDJSON / JSON array body record by record.
+
+    Only the first ``sample_records`` records are kept; ``on_record(index, record)`` sees
+    every record (per-record validators), and ``stop_when`` can end the download early.
+    """
+    limit = DEFAULT_SAMPLE_RECORDS if sample_records is None else max(int(sample_records), 0)
+    predicate = compile_expression(stop_when) if stop_when else None
+    metrics = StreamMetrics(headers_ms=headers_ms, stall_threshold_ms=stall_threshold_ms)
+    sample: List[Any] = []
+    count = 0
+    parse_errors = 0
+    first_error: Optional[str] = None
+    stop_reason: Optional[str] = None
+
+    def _on_error(line_no: int, msg: str) -> None:
+        nonlocal parse_errors, first_error
+        parse_errors += 1
+        if first_error is None:
+            first_error = f"line {line_no}: {msg}"
+
+    if fmt == "ndjson":
+        records: Iterator[Any] = iter_ndjson(response.iter_lines(), _on_error)
+    else:
+        records = iter_json_array(response.iter_text())
+    try:
+        for record in records:
+            metrics.on_event((time.perf_counter() - start_time) * 1000.0)
+            if len(sample) < limit:
+                sample.append(record)
+            if on_record is not None:
+                on_record(count, record)
+            count += 1
+            if predicate is not None:
+                try:
+                    matched = bool(predicate({"record": record, "record_count": count, "elapsed_ms": metrics.last_ms}))
+                except Exception:
+                    matched = False
+                if matched:
+                    stop_reason = "stop_when"
+                    break
+    except Exception as e:
+        _on_error(count + 1, str(e))
+    finally:
+        response.close()
+    duration_ms = (time.perf_counter() - start_time) * 1000.0
+
+    summary: Dict[str, Any] = {
+        "format": fmt,
+        "record_count": count,
+        "records_kept": len(sample),
+        "parse_errors": parse_errors,
+        "stopped_early": stop_reason is not None,
+    }
+    if first_error:
+        summary["first_parse_error"] = first_error
+    if stop_reason:
+        summary["stop_reason"] = stop_reason
+    summary.update(metrics.summary(duration_ms, response.num_bytes_downloaded))
+    # Records rather than SSE events: rename the rate and first-item fields accordingly
+    summary["records_per_sec"] = summary.pop("events_per_sec")
+    summary["first_record_ms"] = summary.pop("ttft_ms")
+    return {"stream_records": sample, "stream_summary": summary}
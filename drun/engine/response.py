@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Mapping, Optional
+
+try:  # optional fast path: pip install "drun[fast]"
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    _orjson = None
+
+_UNSET = object()
+
+
+def loads_json(content: bytes | str) -> Any:
+    """Parse JSON bytes with orjson when installed, else the stdlib (same results)."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(content)
+        except _orjson.JSONDecodeError:
+            # orjson is strict (e.g. NaN, non-UTF-8); let the stdlib decide
+            pass
+    return json.loads(content)
+
+
+class DeferredBody(ABC):
+    """Response body whose Python value is produced on first use.
+
+    ``value()`` returns the parsed JSON (or text when the body is not JSON) and caches
+    it, so the body is decoded at most once per response however many extracts,
+    validators and reporters read it.
+    """
+
+    @abstractmethod
+    def value(self) -> Any:
+        ...
+
+
+class LazyBody(DeferredBody):
+    """In-memory response bytes decoded once, on demand."""
+
+    __slots__ = ("content", "encoding", "_value")
+
+    def __init__(self, content: bytes, encoding: Optional[str] = None) -> None:
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self._value: Any = _UNSET
+
+    def value(self) -> Any:
+        # Racing workers on a shared (cached) response at worst decode twice
+        if self._value is _UNSET:
+            self._value = self._decode()
+        return self._value
+
+    def _decode(self) -> Any:
+        if not self.content:
+            return ""
+        try:
+            return loads_json(self.content)
+        except (ValueError, UnicodeDecodeError):
+            return self.content.decode(self.encoding, errors="replace")
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    def __repr__(self) -> str:
+        state = "decoded" if self._value is not _UNSET else "pending"
+        return f"<LazyBody {len(self.content)} bytes {state}>"
+
+
+def body_value(body: Any) -> Any:
+    """Materialize a deferred body; other values are returned unchanged."""
+    return body.value() if isinstance(body, DeferredBody) else body
+
+
+def headers_dict(headers: Optional[Mapping[str, str]]) -> Dict[str, str]:
+    """Plain dict of (case-insensitive) response headers for logs, hooks and reports."""
+    return dict(headers.items()) if headers else {}
+
+
+def header_value(headers: Optional[Mapping[str, str]], name: str) -> Optional[str]:
+    """Case-insensitive header lookup: O(1) on httpx.Headers, a scan for plain dicts."""
+    if not headers:
+        return None
+    if not isinstance(headers, dict):
+        return headers.get(name)
+    lowered = name.lower()
+    for key, val in headers.items():
+        if key.lower() == lowered:
+            return val
+    return None
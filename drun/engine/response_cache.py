@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import copy
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+# Request headers that change who is asking (or what representation is returned);
+# everything else (tracing ids, user agents, ...) does not split the cache.
+CACHE_KEY_HEADERS = (
+    "authorization",
+    "proxy-authorization",
+    "cookie",
+    "x-api-key",
+    "x-auth-token",
+    "x-access-token",
+    "accept",
+    "accept-language",
+)
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.ok = False
+
+
+class ResponseCache:
+    """Run-scoped cache for idempotent requests with single-flight coalescing.
+
+    ``get_or_fetch`` returns a deep copy of a stored value while it is fresh. When several
+    threads ask for the same missing key, one performs the request and the others wait
+    for its result; if that result is not cacheable (errors, non-2xx) each waiter
+    sends its own request.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key_for(client: Any, req: Dict[str, Any]) -> str:
+        method = str(req.get("method") or "GET").upper()
+        path = str(req.get("path") or "")
+        base_url = getattr(client, "base_url", "") or ""
+        try:
+            url = str(httpx.URL(base_url).join(path)) if base_url else path
+        except Exception:
+            url = path
+        headers: Dict[str, str] = {}
+        for source in (getattr(client, "headers", None) or {}, req.get("headers") or {}):
+            for k, v in source.items():
+                if str(k).lower() in CACHE_KEY_HEADERS:
+                    headers[str(k).lower()] = str(v)
+        parts = {
+            "method": method,
+            "url": url,
+            "params": req.get("params") or {},
+            "headers": headers,
+            "auth": req.get("auth") or {},
+        }
+        return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+    def get_or_fetch(
+        self,
+        key: str,
+        ttl: Optional[float],
+        fetch: Callable[[], Any],
+        cacheable: Callable[[Any], bool],
+    ) -> Tuple[Any, bool]:
+        """Return (value, from_cache). ``ttl=None`` keeps the entry for the whole run."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    expires, value = entry
+                    if expires is None or time.monotonic() < expires:
+                        self.hits += 1
+                        return copy.deepcopy(value), True
+                    del self._entries[key]
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _InFlight()
+                    self.misses += 1
+            assert flight is not None
+            if leader:
+                break
+            flight.done.wait()
+            if flight.ok:
+                with self._lock:
+                    self.coalesced += 1
+                return copy.deepcopy(flight.value), True
+            # Leader's response was not cacheable: send our own request
+            with self._lock:
+                self.misses += 1
+            return fetch(), False
+
+        value: Any = None
+        ok = False
+        try:
+            value = fetch()
+            ok = cacheable(value)
+            if ok:
+                with self._lock:
+                    expires = time.monotonic() + ttl if ttl is not None else None
+                    self._entries[key] = (expires, copy.deepcopy(value))
+            return value, False
+        finally:
+            try:
+                flight.value = copy.deepcopy(value) if ok else None
+                flight.ok = ok
+            finally:
+                # Always release waiters, even if copying the value failed
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self._entries)}
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+def full_jitter_backoff(attempt: int, base: float, cap: float, rng: Optional[random.Random] = None) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    upper = min(max(cap, 0.0), max(base, 0.0) * (2 ** max(attempt, 0)))
+    return (rng or random).uniform(0.0, upper) if upper > 0 else 0.0
+
+
+def parse_retry_after(value: Any, *, now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds to wait."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(float(text), 0.0)
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if dt is None:
+        return None
+    return max(dt.timestamp() - (now if now is not None else time.time()), 0.0)
+
+
+class RetryBudget:
+    """Run-wide cap on retries, expressed as a percentage of first attempts.
+
+    A retry is allowed while ``retries < max(min_retries, requests * percent / 100)``,
+    so a flapping backend cannot multiply the load sent to it. The floor keeps small
+    runs able to retry at all. ``percent=None`` disables the cap.
+    """
+
+    def __init__(self, percent: Optional[float] = 20.0, *, min_retries: int = 10) -> None:
+        self.percent = percent
+        self.min_retries = max(int(min_retries), 0)
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.percent is not None:
+                allowed = max(float(self.min_retries), self.requests * self.percent / 100.0)
+                if self.retries + 1 > allowed:
+                    self.denied += 1
+                    return False
+            self.retries += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "budget_denied": self.denied,
+                "budget_percent": self.percent,
+            }
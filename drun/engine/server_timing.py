@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from drun.engine.response import header_value
+from drun.engine.stream_metrics import percentile
+
+# Backend latency headers read by default (single value in ms)
+DEFAULT_LATENCY_HEADERS = ("X-Envoy-Upstream-Service-Time",)
+
+_NUMBER_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)")
+
+
+def parse_server_timing(value: Optional[str]) -> Dict[str, float]:
+    """``db;dur=53.2, app;desc="x";dur=47`` -> ``{"db": 53.2, "app": 47.0}``.
+
+    Only metrics with a numeric ``dur`` are kept; a repeated metric name keeps its first
+    value (as browsers do). Malformed entries are skipped.
+    """
+    metrics: Dict[str, float] = {}
+    if not value:
+        return metrics
+    for entry in _split_unquoted(value, ","):
+        parts = _split_unquoted(entry, ";")
+        name = parts[0].strip() if parts else ""
+        if not name or name in metrics:
+            continue
+        for param in parts[1:]:
+            key, _, raw = param.partition("=")
+            if key.strip().lower() != "dur":
+                continue
+            try:
+                metrics[name] = float(raw.strip().strip('"'))
+            except ValueError:
+                pass
+            break
+    return metrics
+
+
+def _split_unquoted(text: str, sep: str) -> List[str]:
+    # Separators inside quoted desc="..." values do not split
+    out: List[str] = []
+    buf: List[str] = []
+    quoted = False
+    escaped = False
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif ch == "\\" and quoted:
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif ch == sep and not quoted:
+            out.append("".join(buf))
+            buf = []
+            continue
+        buf.append(ch)
+    out.append("".join(buf))
+    return out
+
+
+def latency_metric_name(header: str) -> str:
+    """``X-Envoy-Upstream-Service-Time`` -> ``envoy_upstream_service_time``."""
+    name = header.strip().lower()
+    if name.startswith("x-"):
+        name = name[2:]
+    return re.sub(r"[^a-z0-9]+", "_", name).strip("_")
+
+
+def server_timings(
+    headers: Optional[Mapping[str, str]],
+    latency_headers: Optional[Sequence[str]] = None,
+) -> Dict[str, float]:
+    """Backend-reported timings of one response in ms: Server-Timing metrics plus latency headers."""
+    if not headers:
+        return {}
+    metrics: Dict[str, float] = {}
+    # Several Server-Timing headers are joined with ", " by httpx.Headers.get
+    metrics.update(parse_server_timing(header_value(headers, "Server-Timing")))
+    for header in DEFAULT_LATENCY_HEADERS if latency_headers is None else latency_headers:
+        raw = header_value(headers, header)
+        m = _NUMBER_RE.match(raw) if raw else None
+        if m:
+            metrics.setdefault(latency_metric_name(header), float(m.group(1)))
+    return metrics
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(sum(samples) / len(samples), 3),
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+def aggregate_server_timing(samples: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-endpoint client vs backend latency from ``{"endpoint", "client_ms", "metrics"}`` samples.
+
+    ``backend_ms`` is the largest metric of each response (metrics usually nest, e.g.
+    ``total`` > ``db``, so summing would double count) and ``client_overhead_ms`` is what
+    the client saw on top of it: network, queuing and proxies.
+    """
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for sample in samples:
+        metrics = sample.get("metrics") or {}
+        if not metrics:
+            continue
+        g = grouped.setdefault(sample["endpoint"], {"client": [], "backend": [], "overhead": [], "metrics": {}})
+        client_ms = float(sample.get("client_ms") or 0.0)
+        backend_ms = max(metrics.values())
+        g["client"].append(client_ms)
+        g["backend"].append(backend_ms)
+        g["overhead"].append(max(client_ms - backend_ms, 0.0))
+        for name, ms in metrics.items():
+            g["metrics"].setdefault(name, []).append(float(ms))
+    return {
+        endpoint: {
+            "count": len(g["client"]),
+            "client_ms": _stats(g["client"]),
+            "backend_ms": _stats(g["backend"]),
+            "client_overhead_ms": _stats(g["overhead"]),
+            "metrics": {name: _stats(vals) for name, vals in sorted(g["metrics"].items())},
+        }
+        for endpoint, g in sorted(grouped.items())
+    }
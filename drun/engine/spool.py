@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import weakref
+from typing import Any, Dict, Iterable, Optional, Union
+
+import httpx
+
+from drun.engine.response import DeferredBody, loads_json
+
+# Threshold used when only spool_to_disk is set
+DEFAULT_SPOOL_THRESHOLD = 10 * 1024 * 1024
+# Bytes of a large body kept in memory for logs and reports
+PREVIEW_BYTES = 2048
+# Leading bytes reported as body_prefix for download steps (magic numbers)
+DEFAULT_PREFIX_BYTES = 16
+
+_UNSET = object()
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class SpooledBody(DeferredBody):
+    """Response body that exceeded ``max_body_bytes`` and was not kept in memory.
+
+    The bytes live in a temp file (``spool_to_disk``) or were discarded after the cap;
+    size, sha256 and a short preview are always available. JSON is only parsed when an
+    extract or validator asks for the body, and the temp file is removed once the
+    object is garbage collected.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int,
+        sha256: str,
+        preview: bytes,
+        path: Optional[str],
+        encoding: Optional[str],
+        content_type: Optional[str],
+    ) -> None:
+        self.size = size
+        self.sha256 = sha256
+        self.preview = preview
+        self.path = path
+        self.encoding = encoding or "utf-8"
+        self.content_type = content_type
+        self._value: Any = _UNSET
+        if path is not None:
+            self._finalizer = weakref.finalize(self, _unlink, path)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SpooledBody":
+        # Shared, read-only temp file: copies (e.g. response cache) reference the same body
+        return self
+
+    @property
+    def truncated(self) -> bool:
+        """True when bytes past the cap were discarded (not spooled)."""
+        return self.path is None
+
+    def read_bytes(self) -> bytes:
+        if self.path is None:
+            return self.preview
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def preview_text(self) -> str:
+        return self.preview.decode(self.encoding, errors="replace")
+
+    def value(self) -> Any:
+        """Parsed JSON (or text when not JSON), computed on first use and cached."""
+        if self._value is _UNSET:
+            if self.truncated:
+                # Only the preview survived; parsing a prefix would be misleading
+                self._value = self.preview_text()
+            else:
+                raw = self.read_bytes()
+                try:
+                    self._value = loads_json(raw)
+                except (ValueError, UnicodeDecodeError):
+                    self._value = raw.decode(self.encoding, errors="replace")
+        return self._value
+
+    def describe(self) -> Dict[str, Any]:
+        """Report-friendly metadata (no body bytes beyond the preview)."""
+        return {
+            "size": self.size,
+            "sha256": self.sha256,
+            "content_type": self.content_type,
+            "spooled": self.path is not None,
+            "truncated": self.truncated,
+            "preview_bytes": len(self.preview),
+        }
+
+    def cleanup(self) -> None:
+        if self.path is not None:
+            self._finalizer()
+
+
+def digest_stream(resp: httpx.Response, prefix_bytes: int = DEFAULT_PREFIX_BYTES) -> Dict[str, Any]:
+    """Consume a streamed response keeping only its size, sha256 and first bytes.
+
+    ``body_prefix`` is lowercase hex so magic numbers compare exactly (``%PDF`` -> ``25504446``).
+    """
+    return _digest(resp, resp.iter_bytes(), prefix_bytes)
+
+
+def digest_content(resp: httpx.Response, prefix_bytes: int = DEFAULT_PREFIX_BYTES) -> Dict[str, Any]:
+    """Same fields as :func:`digest_stream` for a response that was already read."""
+    return _digest(resp, [resp.content], prefix_bytes)
+
+
+def _digest(resp: httpx.Response, chunks: Iterable[bytes], prefix_bytes: int) -> Dict[str, Any]:
+    hasher = hashlib.sha256()
+    size = 0
+    prefix = bytearray()
+    for chunk in chunks:
+        hasher.update(chunk)
+        size += len(chunk)
+        if len(prefix) < prefix_bytes:
+            prefix += chunk[: prefix_bytes - len(prefix)]
+    return {
+        "body_size": size,
+        "body_sha256": hasher.hexdigest(),
+        "body_prefix": bytes(prefix).hex(),
+        "content_type": resp.headers.get("content-type"),
+    }
+
+
+def read_capped(
+    resp: httpx.Response,
+    max_body_bytes: Optional[int],
+    spool_to_disk: bool,
+) -> Union[bytes, SpooledBody]:
+    """Read a streamed response; bodies over ``max_body_bytes`` become a :class:`SpooledBody`.
+
+    Small bodies are returned as bytes. Once the cap is crossed the body is hashed as it
+    streams and either written to a temp file or dropped (keeping the preview).
+    """
+    limit = max_body_bytes if max_body_bytes is not None else DEFAULT_SPOOL_THRESHOLD
+    buf = bytearray()
+    size = 0
+    hasher = None
+    spool = None
+    path: Optional[str] = None
+    try:
+        for chunk in resp.iter_bytes():
+            size += len(chunk)
+            if hasher is None:
+                buf += chunk
+                if len(buf) <= limit:
+                    continue
+                # Crossed the cap: switch to hashing + spooling, keep only the preview
+                hasher = hashlib.sha256(buf)
+                if spool_to_disk:
+                    fd, path = tempfile.mkstemp(prefix="drun-body-", suffix=".bin")
+                    spool = os.fdopen(fd, "wb")
+                    spool.write(buf)
+                del buf[PREVIEW_BYTES:]
+                continue
+            hasher.update(chunk)
+            if spool is not None:
+                spool.write(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+        if path is not None:
+            _unlink(path)
+        raise
+    if spool is not None:
+        spool.close()
+    if hasher is None:
+        return bytes(buf)
+    return SpooledBody(
+        size=size,
+        sha256=hasher.hexdigest(),
+        preview=bytes(buf),
+        path=path,
+        encoding=resp.charset_encoding,
+        content_type=resp.headers.get("content-type"),
+    )
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+# Gaps longer than this (ms) between consecutive events count as stalls
+DEFAULT_STALL_THRESHOLD_MS = 2000.0
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (~2% relative error) with O(1) memory per bucket.
+
+    Used for inter-event gaps so 10k+ event streams do not keep every sample, and
+    mergeable so benchmarks can aggregate percentiles over many streams.
+    """
+
+    _GROWTH = 1.02
+    _FLOOR_MS = 0.001
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.min: Optional[float] = None
+
+    def _bucket(self, value: float) -> int:
+        return int(math.ceil(math.log(max(value, self._FLOOR_MS) / self._FLOOR_MS, self._GROWTH)))
+
+    def add(self, value: float) -> None:
+        b = self._bucket(value)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for b, n in other.buckets.items():
+            self.buckets[b] = self.buckets.get(b, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(q / 100.0 * self.count), 1)
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                # Upper bound of the bucket, clamped to the observed range
+                value = self._FLOOR_MS * (self._GROWTH ** b)
+                return min(max(value, self.min or 0.0), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+def percentile(samples: Iterable[float], q: float) -> float:
+    """Nearest-rank percentile of a sample list."""
+    ordered: List[float] = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(q / 100.0 * len(ordered)) - 1, 0)]
+
+
+class StreamMetrics:
+    """Incremental latency metrics for one streamed response.
+
+    All times are ms since the request was started: ``headers_ms`` when the response
+    headers arrived, ``ttft_ms`` when the first event was parsed, ``duration_ms`` when the
+    stream ended (or was closed early).
+    """
+
+    def __init__(self, headers_ms: float = 0.0, stall_threshold_ms: Optional[float] = None) -> None:
+        self.headers_ms = headers_ms
+        self.stall_threshold_ms = stall_threshold_ms if stall_threshold_ms is not None else DEFAULT_STALL_THRESHOLD_MS
+        self.gaps = LatencyHistogram()
+        self.first_ms: Optional[float] = None
+        self.last_ms: Optional[float] = None
+        self.events = 0
+        self.stalls = 0
+        self.longest_stall_ms = 0.0
+
+    def on_event(self, at_ms: float) -> None:
+        if self.last_ms is not None:
+            gap = max(at_ms - self.last_ms, 0.0)
+            self.gaps.add(gap)
+            if gap >= self.stall_threshold_ms:
+                self.stalls += 1
+                self.longest_stall_ms = max(self.longest_stall_ms, gap)
+        else:
+            self.first_ms = at_ms
+        self.last_ms = at_ms
+        self.events += 1
+
+    def summary(self, duration_ms: float, num_bytes: int) -> Dict[str, Any]:
+        body_ms = max(duration_ms - self.headers_ms, 0.0)
+        span_ms = (self.last_ms - self.first_ms) if self.first_ms is not None and self.last_ms is not None else 0.0
+        # Rate over the span between first and last event; fall back to the body phase
+        rate_window_s = (span_ms if span_ms > 0 else body_ms) / 1000.0
+        return {
+            "headers_ms": round(self.headers_ms, 3),
+            "ttft_ms": round(self.first_ms, 3) if self.first_ms is not None else None,
+            "duration_ms": round(duration_ms, 3),
+            "gap_p50_ms": round(self.gaps.percentile(50), 3),
+            "gap_p95_ms": round(self.gaps.percentile(95), 3),
+            "gap_max_ms": round(self.gaps.max, 3),
+            "gap_mean_ms": round(self.gaps.mean(), 3),
+            "events_per_sec": round(self.events / rate_window_s, 3) if rate_window_s > 0 else 0.0,
+            "bytes": num_bytes,
+            "bytes_per_sec": round(num_bytes / (body_ms / 1000.0), 3) if body_ms > 0 else 0.0,
+            "stalls": self.stalls,
+            "longest_stall_ms": round(self.longest_stall_ms, 3),
+            "stall_threshold_ms": self.stall_threshold_ms,
+        }
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import ipaddress
+import socket
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import httpcore
+import httpx
+
+
+# Recorder of the request currently being sent on this thread/context.
+_current_recorder: ContextVar[Optional["TimingRecorder"]] = ContextVar("drun_timing_recorder", default=None)
+
+# httpcore trace prefix -> httpstat phase
+_TRACE_PHASES = {
+    "connect_tcp": "connect",
+    "connect_unix_socket": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "download",
+}
+
+HTTPSTAT_PHASES = ("dns", "connect", "tls", "send", "ttfb", "download")
+
+
+class TimingRecorder:
+    """Collect httpstat-style connection timings for one logical request.
+
+    Fed by httpx's ``trace`` request extension (connect/TLS/send/receive) and by
+    :class:`TimingNetworkBackend` (DNS). Redirect hops accumulate into the same record.
+    """
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self._started: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {k: 0.0 for k in HTTPSTAT_PHASES}
+        self.segments: List[Dict[str, Any]] = []
+        self.new_connections = 0
+
+    def _add(self, phase: str, start: float, end: float) -> None:
+        dur = (end - start) * 1000.0
+        self.phases[phase] = self.phases.get(phase, 0.0) + dur
+        self.segments.append(
+            {
+                "phase": phase,
+                "start_ms": round((start - self.t0) * 1000.0, 3),
+                "end_ms": round((end - self.t0) * 1000.0, 3),
+            }
+        )
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # event names look like "connection.connect_tcp.started" / "http11.send_request_body.complete"
+        prefix, _, state = event_name.rpartition(".")
+        step = prefix.rpartition(".")[2]
+        phase = _TRACE_PHASES.get(step)
+        if phase is None:
+            return
+        now = time.perf_counter()
+        if state == "started":
+            self._started[prefix] = now
+            if phase == "connect":
+                self.new_connections += 1
+        elif state in ("complete", "failed"):
+            start = self._started.pop(prefix, None)
+            if start is not None:
+                self._add(phase, start, now)
+
+    def record_dns(self, start: float, end: float) -> None:
+        self._add("dns", start, end)
+
+    def result(self) -> Dict[str, Any]:
+        phases = dict(self.phases)
+        # DNS resolution happens inside connect_tcp; report TCP connect on its own
+        phases["connect"] = max(phases.get("connect", 0.0) - phases.get("dns", 0.0), 0.0)
+        out: Dict[str, Any] = {k: round(v, 3) for k, v in phases.items()}
+        out["total"] = round(max((s["end_ms"] for s in self.segments), default=0.0), 3)
+        out["reused"] = self.new_connections == 0
+        out["segments"] = self.segments
+        return out
+
+
+ResolveMap = Dict[Tuple[str, Optional[int]], str]
+
+
+def parse_resolve(value: Any) -> ResolveMap:
+    """Parse host overrides like curl ``--resolve``.
+
+    Accepts a mapping ``{"api.example.com:443": "10.0.0.5", "api.example.com": "10.0.0.6"}``
+    (no port = any port) or a list of ``"host:port:address"`` strings. IPv6 addresses may be
+    written with or without brackets.
+    """
+    out: ResolveMap = {}
+    if not value:
+        return out
+    if isinstance(value, Mapping):
+        items = [(str(k), str(v)) for k, v in value.items()]
+    elif isinstance(value, (list, tuple)):
+        items = []
+        for entry in value:
+            host, sep, rest = str(entry).partition(":")
+            port, sep2, addr = rest.partition(":")
+            if not (sep and sep2 and host and addr):
+                raise ValueError(f"Invalid resolve entry {entry!r}; expected 'host:port:address'")
+            items.append((f"{host}:{port}", addr))
+    else:
+        raise ValueError(f"Invalid resolve value {value!r}; expected a mapping or a list of 'host:port:address'")
+    for key, addr in items:
+        host, sep, port = key.rpartition(":")
+        if sep and port.isdigit():
+            out[(host.lower(), int(port))] = addr.strip("[]")
+        else:
+            out[(key.lower(), None)] = addr.strip("[]")
+    return out
+
+
+class TimingNetworkBackend(httpcore.NetworkBackend):
+    """Network backend that resolves host names itself so DNS time can be measured.
+
+    ``resolve`` pins host names to fixed addresses (skipping DNS); TLS SNI and the Host
+    header still use the original name because httpcore passes them separately.
+    """
+
+    def __init__(self, inner: Optional[httpcore.NetworkBackend] = None, resolve: Optional[ResolveMap] = None) -> None:
+        self._inner = inner or httpcore.SyncBackend()
+        self.resolve: ResolveMap = dict(resolve or {})
+
+    def _pinned(self, host: str, port: int) -> Optional[str]:
+        if not self.resolve:
+            return None
+        key = host.lower()
+        return self.resolve.get((key, port)) or self.resolve.get((key, None))
+
+    def _resolve(self, host: str, port: int) -> List[str]:
+        return [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+
+    def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.NetworkStream:
+        pinned = self._pinned(host, port)
+        try:
+            ipaddress.ip_address(pinned or host)
+            addresses = [pinned or host]
+        except ValueError:
+            start = time.perf_counter()
+            try:
+                addresses = self._resolve(pinned or host, port)
+            except OSError:
+                # Let the inner backend raise httpcore's mapped ConnectError
+                addresses = [host]
+            rec = _current_recorder.get()
+            if rec is not None:
+                rec.record_dns(start, time.perf_counter())
+
+        last_exc: Optional[Exception] = None
+        for addr in addresses:
+            try:
+                return self._inner.connect_tcp(
+                    addr, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_exc = e
+        assert last_exc is not None
+        raise last_exc
+
+    def connect_unix_socket(
+        self, path: str, timeout: Optional[float] = None, socket_options: Optional[Iterable[Any]] = None
+    ) -> httpcore.NetworkStream:
+        return self._inner.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    def sleep(self, seconds: float) -> None:
+        self._inner.sleep(seconds)
+
+
+def install_timing_backend(client: httpx.Client, resolve: Optional[ResolveMap] = None) -> None:
+    """Wrap the network backend of the client's default transport for DNS timing.
+
+    The client keeps its own transport so verify/proxy-from-env handling is unchanged;
+    proxied mounts simply report no separate DNS phase. ``resolve`` pins host names
+    to addresses for every new connection.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    backend = getattr(pool, "_network_backend", None)
+    if backend is None:
+        return
+    if isinstance(backend, TimingNetworkBackend):
+        backend.resolve.update(resolve or {})
+    else:
+        pool._network_backend = TimingNetworkBackend(backend, resolve=resolve)
+
+
+@contextmanager
+def record_timings() -> Iterator[TimingRecorder]:
+    """Make DNS timings from the network backend land in the yielded recorder."""
+    rec = TimingRecorder()
+    token = _current_recorder.set(rec)
+    try:
+        yield rec
+    finally:
+        _current_recorder.reset(token)
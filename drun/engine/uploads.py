@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import mmap
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+from drun.engine.payloads import GeneratedBody, build_generated_body
+
+# Bytes handed to the transport per write when streaming a file body
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileContent:
+    """Request body streamed from a file, memory-mapped when the platform allows it.
+
+    Re-iterable (httpx may resend the body on redirects, drun on retries) and never holds
+    more than one chunk in memory, so multi-GB uploads run in constant memory.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.size = os.path.getsize(path)
+
+    def __iter__(self) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            mm = None
+            if self.size:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    mm = None  # pipes, special files, some network filesystems
+            if mm is not None:
+                with mm:
+                    _madvise(mm, "MADV_SEQUENTIAL", 0, self.size)
+                    for offset in range(0, self.size, UPLOAD_CHUNK_SIZE):
+                        length = min(UPLOAD_CHUNK_SIZE, self.size - offset)
+                        yield mm[offset:offset + length]
+                        # Drop pages already sent so resident memory stays flat
+                        _madvise(mm, "MADV_DONTNEED", offset, length)
+                return
+            while True:
+                chunk = f.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def _madvise(mm: mmap.mmap, advice: str, start: int, length: int) -> None:
+    flag = getattr(mmap, advice, None)
+    if flag is None or not hasattr(mm, "madvise"):
+        return  # not available on this platform
+    try:
+        mm.madvise(flag, start, length)
+    except OSError:
+        pass
+
+
+def resolve_upload_path(path: str, base_dir: Optional[str] = None) -> str:
+    """Resolve a YAML-referenced upload path relative to the case file's directory.
+
+    Falls back to the working directory when the file only exists there, so suites
+    written against the old CWD-relative behavior keep working.
+    """
+    candidate = Path(path).expanduser()
+    if candidate.is_absolute() or not base_dir:
+        return str(candidate)
+    resolved = Path(base_dir) / candidate
+    if not resolved.exists() and candidate.exists():
+        return str(candidate)
+    return str(resolved)
+
+
+def _file_spec(value: Any, what: str) -> Dict[str, Any]:
+    if isinstance(value, str):
+        return {"path": value}
+    if isinstance(value, dict) and value.get("path"):
+        return value
+    raise ValueError(f"Invalid {what}: expected a path or {{path: ..., content_type: ...}}, got {value!r}")
+
+
+class UploadPlan:
+    """httpx arguments for ``files`` / ``body_file`` / ``body_generate`` steps, plus open file handles."""
+
+    def __init__(
+        self,
+        files: Any = None,
+        body_file: Any = None,
+        body_generate: Optional[Dict[str, Any]] = None,
+        *,
+        base_dir: Optional[str] = None,
+    ) -> None:
+        self.files: Any = files
+        # Directory of the case file; relative paths are resolved against it
+        self.base_dir = base_dir
+        self.content: Optional[Union[FileContent, GeneratedBody]] = None
+        self.generated: Optional[GeneratedBody] = None
+        self.headers: Dict[str, str] = {}
+        self.total_bytes = 0
+        self.file_count = 0
+        self._handles: List[BinaryIO] = []
+        try:
+            if isinstance(files, dict) and any(isinstance(v, dict) and "path" in v for v in files.values()):
+                self.files = {k: self._open_part(v) for k, v in files.items()}
+            if body_file is not None:
+                spec = _file_spec(body_file, "body_file")
+                self.content = FileContent(resolve_upload_path(str(spec["path"]), self.base_dir))
+                self.total_bytes += self.content.size
+                self.file_count += 1
+                # Known length: sent with Content-Length rather than chunked encoding
+                self.headers["Content-Length"] = str(self.content.size)
+                self.headers["Content-Type"] = str(spec.get("content_type") or "application/octet-stream")
+            elif body_generate is not None:
+                self.generated = build_generated_body(body_generate)
+                self.content = self.generated
+                self.total_bytes += self.generated.size
+                self.headers["Content-Length"] = str(self.generated.size)
+                self.headers["Content-Type"] = str(body_generate.get("content_type") or self.generated.content_type)
+        except Exception:
+            self.close()
+            raise
+
+    def _open_part(self, value: Any) -> Any:
+        if not (isinstance(value, dict) and "path" in value):
+            return value  # inline content is passed to httpx unchanged
+        spec = _file_spec(value, "files entry")
+        path = resolve_upload_path(str(spec["path"]), self.base_dir)
+        fh = open(path, "rb")
+        self._handles.append(fh)
+        self.total_bytes += os.fstat(fh.fileno()).st_size
+        self.file_count += 1
+        filename = spec.get("filename") or os.path.basename(path)
+        # httpx reads file objects in chunks and takes the length from fstat
+        if spec.get("content_type"):
+            return (filename, fh, spec["content_type"])
+        return (filename, fh)
+
+    @property
+    def active(self) -> bool:
+        return self.file_count > 0 or self.generated is not None
+
+    def close(self) -> None:
+        for fh in self._handles:
+            try:
+                fh.close()
+            except OSError:
+                pass
+        self._handles = []
+
+
+def upload_stats(plan: UploadPlan, httpstat: Dict[str, Any], timings: Dict[str, Any]) -> Dict[str, Any]:
+    """Upload size and time-to-upload (request send phase; TTFB when no trace is available)."""
+    upload_ms = float(httpstat.get("send") or 0.0) or float(timings.get("ttfb") or 0.0)
+    return {
+        "bytes": plan.total_bytes,
+        "files": plan.file_count,
+        "upload_ms": round(upload_ms, 3),
+        "bytes_per_sec": round(plan.total_bytes / (upload_ms / 1000.0), 3) if upload_ms > 0 else 0.0,
+    }
@@ -6,6 +6,9 @@ from typing import Dict, Optional, Tuple
 
 import yaml
 
+# Structured (non-variable) keys kept as-is from env YAML files
+_STRUCTURED_KEYS = ("base_url", "headers", "rate_limits", "uds", "resolve")
+
 
 def _read_kv_file(path: Path) -> Dict[str, str]:
     data: Dict[str, str] = {}
@@ -30,12 +33,12 @@ def _read_yaml_vars(path: Path) -> Dict[str, str]:
         if "variables" in obj and isinstance(obj["variables"], dict):
             for k, v in obj["variables"].items():
                 out[str(k)] = v
-        for k in ("base_url", "headers"):
+        for k in _STRUCTURED_KEYS:
             if k in obj:
                 out[k] = obj[k]
         # also merge top-level primitive values as variables
         for k, v in obj.items():
-            if k not in ("variables", "base_url", "headers") and not isinstance(v, (dict, list)):
+            if k != "variables" and k not in _STRUCTURED_KEYS and not isinstance(v, (dict, list)):
                 out[str(k)] = v
     return out
 
@@ -74,11 +77,11 @@ def _read_env_yaml_named(single: Path, name: str) -> Dict[str, str]:
     if "variables" in sec and isinstance(sec["variables"], dict):
         for k, v in sec["variables"].items():
             out[str(k)] = v
-    for k in ("base_url", "headers"):
+    for k in _STRUCTURED_KEYS:
         if k in sec:
             out[k] = sec[k]
     for k, v in sec.items():
-        if k not in ("variables", "base_url", "headers") and not isinstance(v, (dict, list)):
+        if k != "variables" and k not in _STRUCTURED_KEYS and not isinstance(v, (dict, list)):
             out[str(k)] = v
     return out
 
@@ -88,7 +91,7 @@ def load_environment(env_name: Optional[str], env_file: Optional[str]) -> Dict[s
 
     Merge order (low -> high): named YAML env < explicit env file < OS ENV
     Keys are duplicated in lowercase for convenient templating.
-    Recognized special keys: base_url, headers.
+    Recognized special keys: base_url, headers, rate_limits, uds, resolve.
     """
     merged: Dict[str, str] = {}
 
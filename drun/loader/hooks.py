@@ -8,6 +8,8 @@ from pathlib import Path
 from types import ModuleType
 from typing import Any, Dict, Optional, Sequence
 
+from drun.utils.cache import get_cache_store
+
 
 def _module_name_for(path: Path) -> str:
     h = hashlib.sha1(str(path).encode()).hexdigest()[:10]
@@ -65,4 +67,10 @@ def get_functions_for(start: Path) -> Dict[str, Any]:
     if not path:
         return {}
     mod = _import_module_from_path(path)
-    return _collect_callables(mod)
+    funcs = _collect_callables(mod)
+    # @drun.cache(scope="disk") hooks persist next to the hooks file
+    for fn in funcs.values():
+        store = get_cache_store(fn)
+        if store is not None:
+            store.bind(path.parent)
+    return funcs
@@ -86,6 +86,8 @@ def _normalize_case_dict(d: Dict[str, Any], path: Path | None = None, raw_text:
                 if line_hint:
                     hint += f"\nHint → {line_hint}"
                 raise LoadError(hint)
+            if "record_validate" in ss:
+                ss["record_validate"] = [v.model_dump() for v in normalize_validators(ss["record_validate"])]
             if "validate" in ss:
                 ss["validate"] = [v.model_dump() for v in normalize_validators(ss["validate"])]
                 # enforce $-only for body checks
@@ -292,7 +294,7 @@ def _format_case_validation_error(exc: ValidationError, obj: Dict[str, Any], pat
             and loc[2] == "request"
         ):
             field = loc[3]
-            if field in {"extract", "validate", "setup_hooks", "teardown_hooks"}:
+            if field in {"extract", "validate", "record_validate", "setup_hooks", "teardown_hooks"}:
                 step_label = _step_name(loc[1])
                 line_info = _find_step_field_location(raw_text, loc[1], field)
                 if line_info:
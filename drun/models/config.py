@@ -12,4 +12,20 @@ class Config(BaseModel):
     timeout: Optional[float] = None
     verify: Optional[bool] = None
     tags: List[str] = Field(default_factory=list)
+    # Max requests/sec to this case's base_url host (only tightens run-wide limits)
+    rate_limit: Optional[float] = None
+    # In-process ASGI/WSGI app ("module:attr") served without a network socket
+    app: Optional[str] = None
+    # Unix domain socket to connect through (base_url still sets Host and path)
+    uds: Optional[str] = None
+    # Pin host names to addresses like curl --resolve: {"api.example.com:443": "10.0.0.5"}
+    resolve: Dict[str, str] = Field(default_factory=dict)
+    # Serve identical GET steps from the run-scoped response cache (steps may opt out with cache: false)
+    cache_get: bool = False
+    # Defaults for steps: bodies over max_body_bytes are spooled to a temp file or truncated
+    max_body_bytes: Optional[int] = None
+    spool_to_disk: bool = False
+    # Backend latency headers (ms) reported next to Server-Timing in $server_timing;
+    # None keeps the default (X-Envoy-Upstream-Service-Time)
+    latency_headers: Optional[List[str]] = None
 
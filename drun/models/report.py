@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class AssertionResult(BaseModel):
@@ -23,7 +23,25 @@ class StepResult(BaseModel):
     status: str  # passed|failed|skipped
     duration_ms: float = 0.0
     error: Optional[str] = None
-    # httpstat 字段已移除
+    retries: int = 0
+    # Per-phase wall time in ms: render, setup_hooks, send (ttfb, body_read), extract,
+    # validate, teardown, overhead, total
+    timings: Dict[str, float] = Field(default_factory=dict)
+    # Connection-level timings (dns/connect/tls/send/ttfb/download/total in ms, reused, segments)
+    httpstat: Dict[str, Any] = Field(default_factory=dict)
+    # Response served from the run-scoped GET cache (or coalesced with an identical in-flight request)
+    cached: bool = False
+    # Backend-reported timings in ms (Server-Timing metrics and latency headers)
+    server_timing: Dict[str, float] = Field(default_factory=dict)
+    # "METHOD /path" of the step template, used to aggregate timings per endpoint
+    endpoint: Optional[str] = None
+    # W3C trace context sent with the request (--traceparent), to find the backend trace
+    trace_id: Optional[str] = None
+    span_id: Optional[str] = None
+    request_id: Optional[str] = None
+    # Inter-event gap histogram of a streamed response (LatencyHistogram; not serialized),
+    # merged by the stream benchmark instead of keeping per-event timestamps
+    _stream_gaps: Any = PrivateAttr(default=None)
 
 
 class CaseInstanceResult(BaseModel):
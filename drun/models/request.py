@@ -1,10 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Literal, Optional
 from pydantic import BaseModel, Field
 from pydantic.config import ConfigDict
 
 
+class DownloadOptions(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    # Hash and count the body while streaming instead of keeping it
+    discard: bool = True
+    prefix_bytes: int = 16  # Leading bytes exposed as $body_prefix (hex)
+
+
+class BodyGenerate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    size: int | str  # bytes or "512KB" / "256MB" / "1GB" (binary units)
+    pattern: Literal["random", "zeros", "json_array"] = "random"
+    seed: int = 0  # same seed -> same bytes
+    content_type: Optional[str] = None
+
+
 class StepRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True, extra="forbid")
     method: str
@@ -14,10 +29,22 @@ class StepRequest(BaseModel):
     # Request body (JSON or raw), previously named 'json' in YAML
     body: Optional[Any] = Field(default=None, alias="json")
     data: Optional[Any] = None
-    files: Optional[Any] = None
+    files: Optional[Any] = None  # {field: {path, content_type?, filename?}} streams the file from disk
+    body_file: Optional[str | Dict[str, Any]] = None  # Raw body streamed from a file: path or {path, content_type}
+    body_generate: Optional[BodyGenerate] = None  # Deterministic synthetic body streamed while sending
+    compress: Optional[Literal["gzip", "deflate"]] = None  # Compress body/data, sent with Content-Encoding
     auth: Optional[Dict[str, str]] = None  # {type: basic|bearer, username, password, token}
     timeout: Optional[float] = None
     verify: Optional[bool] = None
     allow_redirects: Optional[bool] = None
-    stream: bool = False  # Enable streaming mode for SSE
+    # Streaming mode: true / "sse" for Server-Sent Events, "ndjson" or "json_array" for record streams
+    stream: bool | Literal["sse", "ndjson", "json_array"] = False
     stream_timeout: Optional[float] = None  # Streaming timeout in seconds
+    max_events: Optional[int] = None  # Keep only the last N parsed events (ring buffer)
+    keep_raw: bool | int = True  # Raw SSE lines in the result: true=all, false=none, N=first N lines
+    stop_when: Optional[str] = None  # Close the stream once this expression is true (evaluated per event)
+    stall_threshold_ms: Optional[float] = None  # Inter-event gap counted as a stall (default 2000)
+    sample_records: Optional[int] = None  # Record streams: keep the first N records (default 100)
+    max_body_bytes: Optional[int] = None  # Bodies larger than this are not kept in memory
+    spool_to_disk: Optional[bool] = None  # Write such bodies to a temp file (else keep only a preview)
+    download: Optional[DownloadOptions] = None  # File downloads: check $body_sha256 / $body_size / $body_prefix
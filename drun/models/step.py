@@ -6,6 +6,36 @@ from pydantic.config import ConfigDict
 
 from .request import StepRequest
 from .validators import Validator, normalize_validators
+
+
+class RetryPolicy(BaseModel):
+    """Structured retry policy, e.g.::
+
+        retry:
+          max_retries: 3
+          on_status: [429, 503]
+          backoff: 0.5          # base delay (s) for full-jitter exponential backoff
+          max_backoff: 8
+          max_total_delay: 30   # stop retrying once cumulative sleep would exceed this
+    """
+
+    model_config = ConfigDict(extra="forbid")
+    max_retries: int = 3
+    on_status: List[int] = Field(default_factory=list)
+    on_exception: bool = True
+    backoff: Optional[float] = None  # defaults to step.retry_backoff
+    max_backoff: float = 2.0
+    max_total_delay: Optional[float] = 30.0
+    respect_retry_after: bool = True
+
+
+class ResponseCachePolicy(BaseModel):
+    """Opt-in response cache for idempotent GET steps, e.g. ``cache: {ttl: 60}``."""
+
+    model_config = ConfigDict(extra="forbid")
+    ttl: Optional[float] = None  # seconds; None keeps the response for the whole run
+
+
 class Step(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     name: str
@@ -13,16 +43,28 @@ class Step(BaseModel):
     request: StepRequest
     extract: Dict[str, str] = Field(default_factory=dict)
     validators: List[Validator] = Field(default_factory=list, alias="validate")
+    # Checked against every record of an ndjson / json_array stream while it downloads
+    record_validators: List[Validator] = Field(default_factory=list, alias="record_validate")
     setup_hooks: List[str] = Field(default_factory=list)
     teardown_hooks: List[str] = Field(default_factory=list)
     skip: Optional[str | bool] = None
-    retry: int = 0
+    retry: int | RetryPolicy = 0
     retry_backoff: float = 0.5
+    # true / {ttl: N} caches this GET across cases; false opts out of config.cache_get
+    cache: Optional[bool | ResponseCachePolicy] = None
+
+    def retry_policy(self) -> RetryPolicy:
+        """Normalize `retry` to a policy; a plain int keeps the legacy exception-only behavior."""
+        if isinstance(self.retry, RetryPolicy):
+            return self.retry
+        return RetryPolicy(max_retries=max(int(self.retry or 0), 0), on_status=[], on_exception=True)
 
     @classmethod
     def model_validate_obj(cls, data: Dict[str, Any]) -> "Step":
         if "validate" in data:
             data = {**data, "validate": normalize_validators(data["validate"]) }
+        if "record_validate" in data:
+            data = {**data, "record_validate": normalize_validators(data["record_validate"])}
         if "sql_validate" in data:
             raise ValueError(
                 "'sql_validate' is no longer supported in steps. Use setup/teardown hooks to perform SQL checks."
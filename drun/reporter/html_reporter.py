@@ -74,6 +74,119 @@ def _build_assert_table(asserts: List[AssertionResult]) -> str:
     return f"<table class='assert-table'>{thead}<tbody>{''.join(rows)}</tbody></table>"
 
 
+_TIMING_LABELS = [
+    ("render", "模板渲染"),
+    ("setup_hooks", "前置 Hooks"),
+    ("send", "请求发送"),
+    ("throttle", "└ 限流等待"),
+    ("ttfb", "└ 首字节 (TTFB)"),
+    ("body_read", "└ 响应体读取"),
+    ("extract", "变量提取"),
+    ("validate", "断言校验"),
+    ("teardown", "后置 Hooks"),
+    ("overhead", "其他开销"),
+]
+
+
+def _build_timings_table(timings: Dict[str, Any]) -> str:
+    total = float(timings.get("total") or 0.0)
+    scale = total if total > 0 else max([float(v or 0.0) for v in timings.values()] or [1.0]) or 1.0
+    rows = []
+    for key, label in _TIMING_LABELS:
+        if key not in timings:
+            continue
+        ms = float(timings.get(key) or 0.0)
+        width = max(min(ms / scale * 100.0, 100.0), 0.0)
+        rows.append(
+            "<tr>"
+            f"<td>{_escape_html(label)}</td>"
+            f"<td class='t-ms'>{ms:.1f} ms</td>"
+            f"<td class='t-bar'><span style='width:{width:.1f}%'></span></td>"
+            "</tr>"
+        )
+    thead = f"<thead><tr><th>阶段</th><th>耗时</th><th>占比（合计 {total:.1f} ms）</th></tr></thead>"
+    return f"<table class='timing-table'>{thead}<tbody>{''.join(rows)}</tbody></table>"
+
+
+_HTTPSTAT_LABELS = {
+    "dns": "DNS 解析",
+    "connect": "TCP 连接",
+    "tls": "TLS 握手",
+    "send": "请求发送",
+    "ttfb": "服务器处理 (TTFB)",
+    "download": "内容下载",
+}
+
+
+def _build_httpstat_waterfall(httpstat: Dict[str, Any]) -> str:
+    segments = [seg for seg in (httpstat.get("segments") or []) if isinstance(seg, dict)]
+    total = float(httpstat.get("total") or 0.0) or max([float(seg.get("end_ms") or 0.0) for seg in segments] or [1.0]) or 1.0
+    rows = []
+    for seg in segments:
+        phase = str(seg.get("phase") or "")
+        start = float(seg.get("start_ms") or 0.0)
+        end = float(seg.get("end_ms") or start)
+        left = max(min(start / total * 100.0, 100.0), 0.0)
+        width = max(min((end - start) / total * 100.0, 100.0 - left), 0.0)
+        rows.append(
+            "<tr>"
+            f"<td>{_escape_html(_HTTPSTAT_LABELS.get(phase, phase))}</td>"
+            f"<td class='t-ms'>{end - start:.1f} ms</td>"
+            f"<td class='t-bar wf'><span class='ph-{_escape_html(phase)}' style='margin-left:{left:.1f}%;width:{width:.1f}%'></span></td>"
+            "</tr>"
+        )
+    reused = "复用连接" if httpstat.get("reused") else "新建连接"
+    thead = f"<thead><tr><th>阶段</th><th>耗时</th><th>瀑布图（合计 {total:.1f} ms，{reused}）</th></tr></thead>"
+    return f"<table class='timing-table'>{thead}<tbody>{''.join(rows)}</tbody></table>"
+
+
+def _build_server_timing_table(metrics: Dict[str, Any], client_ms: float) -> str:
+    scale = max([float(client_ms or 0.0)] + [float(v or 0.0) for v in metrics.values()]) or 1.0
+    rows = []
+    for name, ms in metrics.items():
+        ms = float(ms or 0.0)
+        width = max(min(ms / scale * 100.0, 100.0), 0.0)
+        rows.append(
+            "<tr>"
+            f"<td>{_escape_html(str(name))}</td>"
+            f"<td class='t-ms'>{ms:.1f} ms</td>"
+            f"<td class='t-bar'><span style='width:{width:.1f}%'></span></td>"
+            "</tr>"
+        )
+    thead = f"<thead><tr><th>指标</th><th>耗时</th><th>占客户端耗时（{float(client_ms or 0.0):.1f} ms）</th></tr></thead>"
+    return f"<table class='timing-table'>{thead}<tbody>{''.join(rows)}</tbody></table>"
+
+
+def _build_server_timing_summary(summary: Dict[str, Any]) -> str:
+    """Per-endpoint client vs backend latency (p50 / p95) for the whole run."""
+    rows = []
+    for endpoint, st in summary.items():
+        metrics = "，".join(
+            f"{_escape_html(str(k))} {v.get('p50', 0):.1f}/{v.get('p95', 0):.1f}"
+            for k, v in (st.get("metrics") or {}).items()
+        )
+        cells = [f"{(st.get(key) or {}).get('p50', 0):.1f} / {(st.get(key) or {}).get('p95', 0):.1f}"
+                 for key in ("client_ms", "backend_ms", "client_overhead_ms")]
+        rows.append(
+            "<tr>"
+            f"<td>{_escape_html(str(endpoint))}</td>"
+            f"<td class='t-ms'>{st.get('count', 0)}</td>"
+            + "".join(f"<td class='t-ms'>{c}</td>" for c in cells)
+            + f"<td>{metrics}</td>"
+            "</tr>"
+        )
+    thead = (
+        "<thead><tr><th>接口</th><th>请求数</th><th>客户端 p50/p95 (ms)</th><th>服务端 p50/p95 (ms)</th>"
+        "<th>网络及其他 p50/p95 (ms)</th><th>Server-Timing 指标 p50/p95 (ms)</th></tr></thead>"
+    )
+    return (
+        "<div class='panel' data-section='server-timing-summary' style='margin:8px 0;'>"
+        "<div class='p-head'><span>服务端耗时（按接口汇总）</span></div>"
+        f"<table class='timing-table'>{thead}<tbody>{''.join(rows)}</tbody></table>"
+        "</div>"
+    )
+
+
 def _extract_merged_content(events: List[Dict[str, Any]]) -> str:
     """Extract and merge text content from stream events"""
     contents = []
@@ -102,14 +215,25 @@ def _build_stream_response_panel(response_map: Dict[str, Any]) -> str:
     stream_summary = response_map.get("stream_summary", {})
     raw_chunks = response_map.get("stream_raw_chunks", [])
     
-    event_count = len(stream_events)
+    event_count = stream_summary.get("event_count", len(stream_events))
     first_chunk_ms = stream_summary.get("first_chunk_ms", 0)
     
     # Stats badges
+    extra_badges = ""
+    if "gap_p95_ms" in stream_summary:
+        extra_badges += (
+            f"<span class='badge-mini'>间隔 p50/p95 {stream_summary.get('gap_p50_ms', 0):.0f}/{stream_summary.get('gap_p95_ms', 0):.0f}ms</span>"
+            f"<span class='badge-mini'>{stream_summary.get('events_per_sec', 0):.1f} events/s</span>"
+        )
+        if stream_summary.get("stalls"):
+            extra_badges += f"<span class='badge-mini'>卡顿 {stream_summary.get('stalls')} 次</span>"
+    if stream_summary.get("events_kept") is not None and stream_summary.get("events_kept") != event_count:
+        extra_badges += f"<span class='badge-mini'>保留最近 {stream_summary.get('events_kept')} 个</span>"
     stats_html = (
         "<span class='stream-stats'>"
         f"<span class='badge-mini'>{event_count} events</span>"
         f"<span class='badge-mini'>首包 {first_chunk_ms:.0f}ms</span>"
+        f"{extra_badges}"
         "</span>"
     )
     
@@ -253,6 +377,27 @@ def _build_step(step: StepResult) -> str:
 
     req_title = "请求体"
     resp_title = "响应体"
+    if isinstance(response_map, dict) and response_map.get("download") and response_map.get("body") is None:
+        dl = response_map.get("download") or {}
+        resp_title = f"响应体（下载校验：共 {dl.get('body_size', 0)} 字节，sha256 {str(dl.get('body_sha256', ''))[:12]}…，内容未保留）"
+        resp_body_json = _json(dl)
+        resp_body_display = _align_like_console(resp_body_json)
+    elif isinstance(response_map, dict) and response_map.get("body_info"):
+        # Body over max_body_bytes: only a preview was kept
+        bi = response_map.get("body_info") or {}
+        resp_title = (
+            f"响应体（预览，共 {bi.get('size', 0)} 字节，"
+            f"{'已写入临时文件' if bi.get('spooled') else '超出部分已丢弃'}，sha256 {str(bi.get('sha256', ''))[:12]}…）"
+        )
+    elif isinstance(response_map, dict) and response_map.get("stream_format"):
+        # NDJSON / JSON array stream: the body is the kept sample of records
+        rs = response_map.get("stream_summary") or {}
+        resp_title = (
+            f"响应体（{rs.get('format')}：共 {rs.get('record_count', 0)} 条，保留前 {rs.get('records_kept', 0)} 条"
+            f"，{rs.get('records_per_sec', 0):.1f} records/s"
+            + (f"，解析错误 {rs.get('parse_errors')} 条" if rs.get("parse_errors") else "")
+            + "）"
+        )
 
     ext_json = _json(step.extracts) if (step.extracts or {}) else None
     curl = step.curl or ""
@@ -273,7 +418,8 @@ def _build_step(step: StepResult) -> str:
         "<div>"
         f"<span class='pill {step.status}'>{step.status}</span>"
         f"<span class='muted' style='margin-left:8px;'>{step.duration_ms:.1f} ms</span>"
-        f"<span class='muted' style='margin-left:8px;'>断言: {pass_cnt} ✓ / {fail_cnt} ✗</span>"
+        + ("<span class='badge-mini' style='margin-left:8px;'>缓存</span>" if step.cached else "")
+        + f"<span class='muted' style='margin-left:8px;'>断言: {pass_cnt} ✓ / {fail_cnt} ✗</span>"
         "</div>"
     )
 
@@ -293,6 +439,8 @@ def _build_step(step: StepResult) -> str:
 
     # Check if response is streaming
     is_stream = response_map.get("is_stream", False) if isinstance(response_map, dict) else False
+    if is_stream and response_map.get("stream_format"):
+        is_stream = False  # record streams render as a regular body panel
     
     if is_stream:
         # Use streaming response panel with view tabs
@@ -339,6 +487,43 @@ def _build_step(step: StepResult) -> str:
             "</div>"
         )
 
+    if step.trace_id:
+        trace_text = "\n".join(
+            f"{label}: {val}"
+            for label, val in (("trace_id", step.trace_id), ("span_id", step.span_id), ("x-request-id", step.request_id))
+            if val
+        )
+        panels.append(
+            "<div class='panel' data-section='trace' style='margin-top:8px;'>"
+            "<div class='p-head'><span>链路追踪</span><span class='actions'><button onclick=\"window.copyPanel && window.copyPanel(this)\">复制</button></span></div>"
+            f"<pre data-raw=\"{_escape_html(trace_text)}\"><code>{_escape_html(trace_text)}</code></pre>"
+            "</div>"
+        )
+
+    if step.timings:
+        panels.append(
+            "<div class='panel' data-section='timings' style='margin-top:8px;'>"
+            "<div class='p-head'><span>耗时分解</span></div>"
+            + _build_timings_table(step.timings)
+            + "</div>"
+        )
+
+    if step.server_timing:
+        panels.append(
+            "<div class='panel' data-section='server-timing' style='margin-top:8px;'>"
+            "<div class='p-head'><span>服务端耗时 (Server-Timing)</span></div>"
+            + _build_server_timing_table(step.server_timing, step.duration_ms)
+            + "</div>"
+        )
+
+    if step.httpstat and step.httpstat.get("segments"):
+        panels.append(
+            "<div class='panel' data-section='httpstat' style='margin-top:8px;'>"
+            "<div class='p-head'><span>连接耗时 (httpstat)</span></div>"
+            + _build_httpstat_waterfall(step.httpstat)
+            + "</div>"
+        )
+
     # Asserts table
     panels.append(
         "<div class='panel' style='margin-top:8px;'>"
@@ -494,6 +679,17 @@ def write_html(report: RunReport, outfile: str | Path) -> None:
   .event-badge { background: var(--chip-bg); padding: 2px 8px; border-radius: 999px; color: var(--muted); font-size: 11px; border: 1px solid var(--border); }
   .event-badge.done { background: rgba(26, 127, 55, 0.1); color: var(--ok); border-color: var(--ok); }
   .event-item pre { margin: 0; padding: 10px; background: var(--bg); font-size: 12px; max-height: 200px; overflow-y: auto; }
+  .timing-table { width:100%; border-collapse: collapse; font-size: 12px; }
+  .timing-table th, .timing-table td { text-align:left; padding: 4px 8px; border-bottom: 1px solid var(--border); }
+  .timing-table td.t-ms { font-family: monospace; white-space: nowrap; width: 110px; }
+  .timing-table td.t-bar { width: 55%; }
+  .timing-table td.t-bar span { display:block; height: 8px; min-width: 1px; border-radius: 4px; background: var(--accent); }
+  .timing-table td.wf span.ph-dns { background: #8250df; }
+  .timing-table td.wf span.ph-connect { background: #bf8700; }
+  .timing-table td.wf span.ph-tls { background: #cf222e; }
+  .timing-table td.wf span.ph-send { background: #57606a; }
+  .timing-table td.wf span.ph-ttfb { background: #0969da; }
+  .timing-table td.wf span.ph-download { background: #1a7f37; }
 </style>
 <script>(function(){
   function esc(s){return s.replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;');}
@@ -732,6 +928,8 @@ def write_html(report: RunReport, outfile: str | Path) -> None:
 
     # Cases
     body_cases = []
+    if s.get("server_timing"):
+        body_cases.append(_build_server_timing_summary(s["server_timing"]))
     for c in report.cases:
         body_cases.append(_build_case(c))
 
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from drun.engine.stream_metrics import LatencyHistogram, percentile
+from drun.models.case import Case
+from drun.models.report import CaseInstanceResult, StepResult
+from drun.runner.concurrency import run_concurrently
+from drun.runner.runner import Runner
+from drun.utils.logging import get_logger
+
+_log = get_logger("drun.bench")
+
+
+def parse_sweep(value: str) -> List[int]:
+    """Parse ``--stream-sweep 1,2,4,8`` into increasing, de-duplicated concurrency levels."""
+    levels: List[int] = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            n = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid concurrency level {part!r}; expected integers like 1,2,4,8")
+        if n < 1:
+            raise ValueError(f"Concurrency levels must be >= 1, got {n}")
+        if n not in levels:
+            levels.append(n)
+    if not levels:
+        raise ValueError("--stream-sweep needs at least one concurrency level")
+    return sorted(levels)
+
+
+def find_stream_step(case: Case, step: Optional[str] = None) -> int:
+    """Index of the step to benchmark: by name or 1-based number, else the first ``stream: true`` step."""
+    if step:
+        if step.isdigit():
+            idx = int(step) - 1
+            if 0 <= idx < len(case.steps):
+                return idx
+            raise ValueError(f"Step number {step} out of range (case has {len(case.steps)} steps)")
+        for i, st in enumerate(case.steps):
+            if st.name == step:
+                return i
+        raise ValueError(f"No step named {step!r} in case {case.config.name!r}")
+    for i, st in enumerate(case.steps):
+        if st.request.stream:
+            return i
+    raise ValueError(f"Case {case.config.name!r} has no 'stream: true' step")
+
+
+def _stream_step(result: CaseInstanceResult) -> Optional[StepResult]:
+    return result.steps[-1] if result.steps else None
+
+
+def _level_stats(level: int, results: List[CaseInstanceResult], wall_s: float) -> Dict[str, Any]:
+    ttft: List[float] = []
+    per_stream_rate: List[float] = []
+    durations: List[float] = []
+    gaps = LatencyHistogram()
+    events = 0
+    errors = 0
+    for res in results:
+        sr = _stream_step(res)
+        summary = ((sr.response or {}).get("stream_summary") or {}) if sr is not None else {}
+        if sr is None or sr.status == "failed" or not summary or (sr.response or {}).get("error"):
+            errors += 1
+        if not summary:
+            continue
+        if summary.get("ttft_ms") is not None:
+            ttft.append(float(summary["ttft_ms"]))
+        durations.append(float(summary.get("duration_ms") or 0.0))
+        per_stream_rate.append(float(summary.get("events_per_sec") or 0.0))
+        events += int(summary.get("event_count") or 0)
+        # Gaps measured while streaming (also covers events not kept in stream_events)
+        if sr._stream_gaps is not None:  # type: ignore[union-attr]
+            gaps.merge(sr._stream_gaps)  # type: ignore[union-attr]
+
+    def r(x: float) -> float:
+        return round(x, 3)
+
+    return {
+        "concurrency": level,
+        "requests": len(results),
+        "errors": errors,
+        "wall_ms": r(wall_s * 1000.0),
+        "ttft_p50_ms": r(percentile(ttft, 50)),
+        "ttft_p95_ms": r(percentile(ttft, 95)),
+        "ttft_p99_ms": r(percentile(ttft, 99)),
+        "gap_p50_ms": r(gaps.percentile(50)),
+        "gap_p95_ms": r(gaps.percentile(95)),
+        "gap_p99_ms": r(gaps.percentile(99)),
+        "gap_max_ms": r(gaps.max),
+        "duration_p95_ms": r(percentile(durations, 95)),
+        "events": events,
+        "events_per_sec": r(events / wall_s) if wall_s > 0 else 0.0,
+        "stream_events_per_sec_p50": r(percentile(per_stream_rate, 50)),
+    }
+
+
+def find_knee(levels: List[Dict[str, Any]], factor: float = 2.0) -> Dict[str, Any]:
+    """Highest concurrency before latency degrades.
+
+    A level degrades when its TTFT p95 or inter-event gap p95 exceeds ``factor`` times
+    the lowest level's value, or when it has errors the baseline did not have.
+    """
+    if not levels:
+        return {"concurrency": None, "reason": "no levels"}
+    base = levels[0]
+    for prev, cur in zip(levels, levels[1:]):
+        reasons = []
+        if base["ttft_p95_ms"] > 0 and cur["ttft_p95_ms"] > factor * base["ttft_p95_ms"]:
+            reasons.append(f"ttft_p95 {cur['ttft_p95_ms']:.1f}ms > {factor:g}x baseline {base['ttft_p95_ms']:.1f}ms")
+        if base["gap_p95_ms"] > 0 and cur["gap_p95_ms"] > factor * base["gap_p95_ms"]:
+            reasons.append(f"gap_p95 {cur['gap_p95_ms']:.1f}ms > {factor:g}x baseline {base['gap_p95_ms']:.1f}ms")
+        if cur["errors"] and not base["errors"]:
+            reasons.append(f"{cur['errors']} errors")
+        if reasons:
+            return {"concurrency": prev["concurrency"], "degraded_at": cur["concurrency"], "reason": "; ".join(reasons)}
+    return {"concurrency": None, "reason": f"no degradation up to concurrency {levels[-1]['concurrency']}"}
+
+
+def run_stream_sweep(
+    runner: Runner,
+    case: Case,
+    step_index: int,
+    levels: List[int],
+    *,
+    requests_per_level: Optional[int] = None,
+    global_vars: Dict[str, Any],
+    params: Dict[str, Any],
+    funcs: Dict[str, Any],
+    envmap: Dict[str, Any],
+    source: Optional[str] = None,
+    knee_factor: float = 2.0,
+) -> Dict[str, Any]:
+    """Run the case's stream step at each concurrency level and summarize per level.
+
+    Steps before the stream step run once first (e.g. login) and their extracted values
+    become variables for every benchmark request.
+    """
+    bench_vars = dict(global_vars)
+    if step_index > 0:
+        prefix = case.model_copy(update={"steps": case.steps[:step_index]})
+        warmup = runner.run_case(prefix, global_vars=bench_vars, params=params, funcs=funcs, envmap=envmap, source=source)
+        if warmup.status == "failed":
+            raise RuntimeError(f"Steps before the stream step failed; cannot benchmark ({warmup.name})")
+        for sr in warmup.steps:
+            bench_vars.update(sr.extracts or {})
+    target = case.model_copy(update={"steps": [case.steps[step_index]], "setup_hooks": [], "teardown_hooks": []})
+
+    def _one(_: int) -> CaseInstanceResult:
+        return runner.run_case(target, global_vars=bench_vars, params=params, funcs=funcs, envmap=envmap, source=source)
+
+    out_levels: List[Dict[str, Any]] = []
+    for level in levels:
+        n = requests_per_level or max(level * 2, 8)
+        t0 = time.perf_counter()
+        results = run_concurrently(range(n), _one, workers=level)
+        stats = _level_stats(level, results, time.perf_counter() - t0)
+        out_levels.append(stats)
+        _log.info(
+            "[BENCH] concurrency=%s requests=%s errors=%s ttft_p95=%.1fms gap_p95=%.1fms events/s=%.1f",
+            level, stats["requests"], stats["errors"], stats["ttft_p95_ms"], stats["gap_p95_ms"], stats["events_per_sec"],
+        )
+    return {
+        "case": case.config.name,
+        "step": case.steps[step_index].name,
+        "levels": out_levels,
+        "knee": find_knee(out_levels, knee_factor),
+    }
+
+
+def format_sweep_table(result: Dict[str, Any]) -> List[str]:
+    header: Tuple[str, ...] = (
+        "conc", "reqs", "err", "ttft_p50", "ttft_p95", "gap_p50", "gap_p95", "gap_p99", "events/s", "ev/s/stream",
+    )
+    rows = [header]
+    for lv in result["levels"]:
+        rows.append(
+            (
+                str(lv["concurrency"]),
+                str(lv["requests"]),
+                str(lv["errors"]),
+                f"{lv['ttft_p50_ms']:.1f}",
+                f"{lv['ttft_p95_ms']:.1f}",
+                f"{lv['gap_p50_ms']:.1f}",
+                f"{lv['gap_p95_ms']:.1f}",
+                f"{lv['gap_p99_ms']:.1f}",
+                f"{lv['events_per_sec']:.1f}",
+                f"{lv['stream_events_per_sec_p50']:.1f}",
+            )
+        )
+    widths = [max(len(r[i]) for r in rows) for i in range(len(header))]
+    return ["  ".join(cell.rjust(widths[i]) for i, cell in enumerate(r)) for r in rows]
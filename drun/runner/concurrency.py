@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from drun.engine.stream_metrics import percentile
+from drun.models.report import CaseInstanceResult
+from drun.utils.logging import get_logger
+
+T = TypeVar("T")
+
+_log = get_logger("drun.concurrency")
+
+
+class AIMDController:
+    """Adaptive worker count (additive increase / multiplicative decrease).
+
+    Every ``window`` finished steps the controller looks at p95 step latency, the error
+    rate (request errors and 5xx) and the 429 rate. While p95 stays under
+    ``target_p95_ms`` and both rates stay flat compared to the previous window, the limit
+    grows by one; otherwise it is halved.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int = 2,
+        minimum: int = 1,
+        maximum: int = 16,
+        target_p95_ms: float = 1000.0,
+        window: int = 20,
+        tolerance: float = 0.02,
+    ) -> None:
+        self.minimum = max(int(minimum), 1)
+        self.maximum = max(int(maximum), self.minimum)
+        self.limit = min(max(int(initial), self.minimum), self.maximum)
+        self.target_p95_ms = target_p95_ms
+        self.window = max(int(window), 1)
+        self.tolerance = tolerance
+        self.trace: List[Dict[str, Any]] = []
+        self._t0 = time.perf_counter()
+        self._latencies: List[float] = []
+        # Steps observed in the current window (latency samples plus errors and 429s)
+        self._samples = 0
+        self._errors = 0
+        self._throttled = 0
+        self._prev_error_rate: Optional[float] = None
+        self._prev_429_rate: Optional[float] = None
+        self._lock = threading.Lock()
+        self._record(reason="start", p95=0.0, error_rate=0.0, rate_429=0.0)
+
+    def _record(self, *, reason: str, p95: float, error_rate: float, rate_429: float) -> None:
+        self.trace.append(
+            {
+                "t_s": round(time.perf_counter() - self._t0, 3),
+                "workers": self.limit,
+                "p95_ms": round(p95, 3),
+                "error_rate": round(error_rate, 4),
+                "rate_429": round(rate_429, 4),
+                "reason": reason,
+            }
+        )
+
+    def observe(self, result: CaseInstanceResult) -> None:
+        with self._lock:
+            for step in result.steps or []:
+                if step.status == "skipped":
+                    continue
+                code = (step.response or {}).get("status_code")
+                self._samples += 1
+                # Errors and 429s only feed their rates: fast failures would drag p95 down
+                if code == 429:
+                    self._throttled += 1
+                elif (step.response or {}).get("error") or not isinstance(code, int) or code >= 500:
+                    self._errors += 1
+                else:
+                    self._latencies.append(float(step.duration_ms or 0.0))
+            if self._samples >= self.window:
+                self._adjust()
+
+    def _adjust(self) -> None:
+        n = self._samples
+        p95 = percentile(self._latencies, 95)
+        error_rate = self._errors / n
+        rate_429 = self._throttled / n
+        self._latencies, self._samples, self._errors, self._throttled = [], 0, 0, 0
+
+        prev_err = self._prev_error_rate if self._prev_error_rate is not None else error_rate
+        prev_429 = self._prev_429_rate if self._prev_429_rate is not None else rate_429
+        self._prev_error_rate, self._prev_429_rate = error_rate, rate_429
+
+        old = self.limit
+        degraded = (
+            p95 > self.target_p95_ms
+            or error_rate > prev_err + self.tolerance
+            or rate_429 > prev_429 + self.tolerance
+            or rate_429 > self.tolerance
+        )
+        if degraded:
+            self.limit = max(self.minimum, int(self.limit * 0.5))
+            reason = "decrease"
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+            reason = "increase"
+        self._record(reason=reason, p95=p95, error_rate=error_rate, rate_429=rate_429)
+        if self.limit != old:
+            _log.info(
+                "[CONCURRENCY] workers %s -> %s (p95=%.1fms target=%.1fms errors=%.1f%% 429=%.1f%%)",
+                old, self.limit, p95, self.target_p95_ms, error_rate * 100.0, rate_429 * 100.0,
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "auto",
+                "final_workers": self.limit,
+                "max_workers_reached": max(e["workers"] for e in self.trace),
+                "target_p95_ms": self.target_p95_ms,
+                "trace": list(self.trace),
+            }
+
+
+def run_concurrently(
+    jobs: Iterable[T],
+    fn: Callable[[T], CaseInstanceResult],
+    *,
+    workers: int,
+    controller: Optional[AIMDController] = None,
+    stop: Optional[Callable[[CaseInstanceResult], bool]] = None,
+) -> List[CaseInstanceResult]:
+    """Run ``fn`` over ``jobs`` on a thread pool, keeping at most ``workers`` (or the
+    controller's current limit) in flight. Results keep the order of ``jobs``.
+
+    ``stop(result)`` returning True stops scheduling new jobs (in-flight jobs finish).
+    """
+    max_workers = controller.maximum if controller is not None else max(int(workers), 1)
+    results: Dict[int, CaseInstanceResult] = {}
+    pending: Set[Future] = set()
+    index_of: Dict[Future, int] = {}
+    it = iter(enumerate(jobs))
+    exhausted = False
+    stopping = False
+
+    def _limit() -> int:
+        return controller.limit if controller is not None else max_workers
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="drun-worker") as pool:
+        while True:
+            while not (exhausted or stopping) and len(pending) < _limit():
+                try:
+                    idx, job = next(it)
+                except StopIteration:
+                    exhausted = True
+                    break
+                fut = pool.submit(fn, job)
+                pending.add(fut)
+                index_of[fut] = idx
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                res = fut.result()
+                results[index_of.pop(fut)] = res
+                if controller is not None:
+                    controller.observe(res)
+                if stop is not None and stop(res):
+                    stopping = True
+    return [results[i] for i in sorted(results)]
+
+
+def parse_workers(value: str) -> Tuple[int, bool]:
+    """Parse ``--workers``: a positive integer or ``auto``. Returns (count, adaptive)."""
+    text = (value or "1").strip().lower()
+    if text == "auto":
+        return 0, True
+    try:
+        n = int(text)
+    except ValueError:
+        raise ValueError(f"--workers must be a positive integer or 'auto', got {value!r}")
+    if n < 1:
+        raise ValueError(f"--workers must be >= 1, got {n}")
+    return n, False
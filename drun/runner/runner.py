@@ -1,19 +1,97 @@
 from __future__ import annotations
 
 import json
+import re
 import time
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
 
+import httpx
+
+from drun.engine.breaker import CircuitBreakerRegistry, CircuitOpenError
+from drun.engine.cassette import Cassette
 from drun.engine.http import HTTPClient
+from drun.engine.payloads import compress_body, encode_json_body, has_placeholders
+from drun.engine.record_stream import RECORD_STREAM_FORMATS
+from drun.engine.ratelimit import RateLimiter
+from drun.engine.response import body_value, header_value, headers_dict
+from drun.engine.response_cache import CACHEABLE_METHODS, ResponseCache
+from drun.engine.server_timing import aggregate_server_timing
+from drun.engine.spool import SpooledBody
+from drun.engine.retry import RetryBudget, full_jitter_backoff, parse_retry_after
 from drun.models.case import Case
 from drun.models.report import AssertionResult, CaseInstanceResult, RunReport, StepResult
-from drun.models.step import Step
+from drun.models.step import ResponseCachePolicy, RetryPolicy, Step
+from drun.models.validators import Validator
 from drun.templating.context import VarContext
 from drun.templating.engine import TemplateEngine
 from drun.runner.extractors import extract_from_body
 from drun.runner.assertions import compare
+from drun.utils.cache import cache_stats
 from drun.utils.curl import to_curl
 from drun.utils.mask import mask_body, mask_headers
+from drun.utils.metrics import MetricsRegistry
+from drun.utils.tracing import SPAN_KIND_CLIENT, Span, TraceContext, Tracer
+
+
+class _RecordChecks:
+    """Per-record validators evaluated while an ndjson / json_array stream downloads.
+
+    Only failure counts and the first few failing records are kept, so validating a
+    million-record export needs no more memory than validating ten.
+    """
+
+    MAX_FAILURE_SAMPLES = 3
+
+    def __init__(self, runner: "Runner", validators: List[Validator], expects: List[Any]) -> None:
+        self.runner = runner
+        self.validators = validators
+        self.expects = expects
+        self.reset()
+
+    def reset(self) -> None:
+        # Called before every attempt so retried streams are counted once
+        self.checked = 0
+        self.failed = [0] * len(self.validators)
+        self.samples: List[List[Dict[str, Any]]] = [[] for _ in self.validators]
+
+    def __call__(self, index: int, record: Any) -> None:
+        self.checked += 1
+        view = {"body": record}
+        for i, v in enumerate(self.validators):
+            actual = self.runner._eval_extract(v.check, view)
+            try:
+                passed, err = compare(v.comparator, actual, self.expects[i])
+            except Exception as e:
+                passed, err = False, str(e)
+            if not passed:
+                self.failed[i] += 1
+                if len(self.samples[i]) < self.MAX_FAILURE_SAMPLES:
+                    self.samples[i].append({"index": index, "actual": actual, "error": err})
+
+    def results(self) -> List[AssertionResult]:
+        out: List[AssertionResult] = []
+        for i, v in enumerate(self.validators):
+            failed = self.failed[i]
+            msg = None
+            if failed:
+                first = ", ".join(f"#{s['index']} actual={s['actual']!r}" for s in self.samples[i])
+                msg = (
+                    f"Record assertion failed for {failed}/{self.checked} records: "
+                    f"{v.check} {v.comparator} {self.expects[i]!r} (first: {first})"
+                )
+            out.append(
+                AssertionResult(
+                    check=f"record: {v.check}",
+                    comparator=v.comparator,
+                    expect=self.expects[i],
+                    actual=f"{failed}/{self.checked} failed",
+                    passed=failed == 0,
+                    message=msg,
+                )
+            )
+        return out
 
 
 class Runner:
@@ -25,6 +103,12 @@ class Runner:
         log_debug: bool = False,
         reveal_secrets: bool = True,
         log_response_headers: bool = True,
+        retry_budget: Optional[float] = 20.0,
+        circuit_breaker: Optional[CircuitBreakerRegistry] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cassette: Optional[Cassette] = None,
+        tracer: Optional[Tracer] = None,
+        metrics: Optional[MetricsRegistry] = None,
     ) -> None:
         self.log = log
         self.failfast = failfast
@@ -32,24 +116,80 @@ class Runner:
         self.reveal = reveal_secrets
         self.log_response_headers = log_response_headers
         self.templater = TemplateEngine()
+        # Percentage of first attempts that may be retried run-wide (None = unlimited)
+        self.retry_budget = RetryBudget(retry_budget)
+        self.breakers = circuit_breaker
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # --record / --replay cassette shared by all clients of the run
+        self.cassette = cassette
+        # Run-scoped cache for opted-in GET steps (shared across cases and workers)
+        self.response_cache = ResponseCache()
+        # Run-level trace: traceparent / x-request-id injection and client spans
+        self.tracer = tracer
+        # Prometheus metrics of the run (--metrics-out / --metrics-push)
+        self.metrics = metrics
+        # Encoded bytes of static request bodies, keyed by id(StepRequest)
+        self._static_bodies: Dict[int, Tuple[Any, Optional[bytes]]] = {}
 
     def _render(self, data: Any, variables: Dict[str, Any], functions: Dict[str, Any] | None = None, envmap: Dict[str, Any] | None = None) -> Any:
         return self.templater.render_value(data, variables, functions, envmap)
 
-    def _build_client(self, case: Case) -> HTTPClient:
+    def _build_client(self, case: Case, source: Optional[str] = None) -> HTTPClient:
         cfg = case.config
+        case_rate_limit = None
+        if cfg.rate_limit and cfg.base_url:
+            try:
+                netloc = httpx.URL(cfg.base_url).netloc.decode("ascii", errors="replace")
+            except Exception:
+                netloc = ""
+            if netloc:
+                # Case-scoped bucket: other cases hitting the same host keep the run-wide limit
+                case_rate_limit = (netloc, self.rate_limiter.case_bucket((id(case), netloc), cfg.rate_limit))
         return HTTPClient(
             base_url=cfg.base_url,
             timeout=cfg.timeout,
             verify=cfg.verify,
             headers=cfg.headers,
+            breakers=self.breakers,
+            rate_limiter=self.rate_limiter,
+            case_rate_limit=case_rate_limit,
+            cassette=self.cassette,
+            app=cfg.app,
+            uds=cfg.uds,
+            resolve=cfg.resolve,
+            max_body_bytes=cfg.max_body_bytes,
+            spool_to_disk=cfg.spool_to_disk,
+            latency_headers=cfg.latency_headers,
+            base_dir=str(Path(source).resolve().parent) if source else None,
         )
 
-    def _request_dict(self, step: Step) -> Dict[str, Any]:
+    def _request_dict(self, step: Step, *, exclude_body: bool = False) -> Dict[str, Any]:
         # Use field names (not aliases) so "body" stays as expected downstream.
         # Otherwise the StepRequest alias "json" leaks into runtime and the
         # payload is dropped, triggering 422 responses on JSON APIs.
-        return step.request.model_dump(exclude_none=True)
+        return step.request.model_dump(exclude_none=True, exclude={"body"} if exclude_body else None)
+
+    def _static_body(self, step: Step) -> Optional[bytes]:
+        """Pre-encoded (and compressed) bytes for a body without template placeholders.
+
+        Computed once per step of the case plan and reused by every parameterized
+        instance, so large static bodies are neither re-rendered nor re-serialized.
+        Steps with setup hooks are skipped because hooks may mutate the request body.
+        """
+        req = step.request
+        if req.body is None or step.setup_hooks:
+            return None
+        cached = self._static_bodies.get(id(req))
+        if cached is not None and cached[0] is req:
+            return cached[1]
+        payload: Optional[bytes] = None
+        if not has_placeholders(req.body):
+            payload = encode_json_body(req.body)
+            if req.compress:
+                payload = compress_body(payload, req.compress)
+        # Keep a reference to the request so its id() cannot be reused while cached
+        self._static_bodies[id(req)] = (req, payload)
+        return payload
 
     def _fmt_json(self, obj: Any) -> str:
         try:
@@ -109,17 +249,62 @@ class Runner:
         if check == "status_code":
             return resp.get("status_code")
         if check.startswith("headers."):
-            key = check.split(".", 1)[1]
-            headers = resp.get("headers") or {}
-            # HTTP headers are case-insensitive, do case-insensitive lookup
-            key_lower = key.lower()
-            for h_key, h_val in headers.items():
-                if h_key.lower() == key_lower:
-                    return h_val
-            return None
+            # HTTP headers are case-insensitive (httpx.Headers for live responses)
+            return header_value(resp.get("headers"), check.split(".", 1)[1])
+        if check == "timing" or check.startswith("timing."):
+            return self._eval_extract("$" + check, resp)
+        if check == "stream_summary" or check.startswith("stream_summary."):
+            return self._eval_extract("$" + check, resp)
+        if check == "stream_records" or check.startswith("stream_records["):
+            return self._eval_extract("$" + check, resp)
+        if check in self._BODY_DIGEST_FIELDS:
+            return self._eval_extract("$" + check, resp)
+        if check in ("upload", "generated", "server_timing") or check.startswith(("upload.", "generated.", "server_timing.")):
+            return self._eval_extract("$" + check, resp)
         # unsupported check format (body.* no longer supported)
         return None
 
+    # Computed while streaming for download steps (no body kept)
+    _BODY_DIGEST_FIELDS = ("body_sha256", "body_size", "body_prefix")
+    # $name checks that refer to the response rather than a variable of the same name
+    _RESPONSE_REFS = (
+        "body", "headers", "status_code", "elapsed_ms", "url", "method", "timing",
+        "stream_events", "stream_summary", "stream_raw_chunks", "stream_records", "upload", "generated",
+        "server_timing",
+    ) + _BODY_DIGEST_FIELDS
+
+    @classmethod
+    def _is_response_ref(cls, check: Any, variables: Dict[str, Any]) -> bool:
+        """True for checks like ``$body_sha256`` that must not be template-rendered."""
+        if not isinstance(check, str):
+            return False
+        m = re.match(r"\$([A-Za-z_][A-Za-z0-9_]*)", check.strip())
+        return bool(m) and m.group(1) in cls._RESPONSE_REFS and m.group(1) not in variables
+
+    @staticmethod
+    def _body_digest(resp: Dict[str, Any]) -> Dict[str, Any]:
+        if resp.get("download"):
+            return resp["download"]
+        body = resp.get("body")
+        if isinstance(body, SpooledBody):
+            return {"body_size": body.size, "body_sha256": body.sha256, "body_prefix": body.preview[:16].hex()}
+        return {}
+
+    @staticmethod
+    def _body_value(resp: Dict[str, Any]) -> Any:
+        # Lazy / spooled bodies are decoded here, the first time a check needs them
+        return body_value(resp.get("body"))
+
+    @classmethod
+    def _plain_response(cls, resp: Dict[str, Any]) -> Dict[str, Any]:
+        """Response with a decoded body and dict headers, as hooks expect."""
+        if not resp:
+            return resp
+        out = {**resp, "headers": headers_dict(resp.get("headers"))}
+        if not isinstance(resp.get("body"), SpooledBody):
+            out["body"] = cls._body_value(resp)
+        return out
+
     def _eval_extract(self, expr: Any, resp: Dict[str, Any]) -> Any:
         # Only support string expressions starting with $
         if not isinstance(expr, str):
@@ -137,9 +322,9 @@ class Runner:
             # best-effort; fall through
             pass
         if e in ("$", "$body"):
-            return resp.get("body")
+            return self._body_value(resp)
         if e == "$headers":
-            return resp.get("headers")
+            return headers_dict(resp.get("headers"))
         if e == "$status_code":
             return resp.get("status_code")
         if e == "$elapsed_ms":
@@ -149,13 +334,7 @@ class Runner:
         if e == "$method":
             return resp.get("method")
         if e.startswith("$headers."):
-            key = e.split(".", 1)[1]
-            headers = resp.get("headers") or {}
-            key_lower = key.lower()
-            for h_key, h_val in headers.items():
-                if h_key.lower() == key_lower:
-                    return h_val
-            return None
+            return header_value(resp.get("headers"), e.split(".", 1)[1])
         
         # Streaming-specific fields
         if e.startswith("$stream_events"):
@@ -173,9 +352,36 @@ class Runner:
             return extract_from_body(resp, jexpr)
         if e == "$stream_raw_chunks":
             return resp.get("stream_raw_chunks")
+        if e[1:] in self._BODY_DIGEST_FIELDS:
+            return self._body_digest(resp).get(e[1:])
+        # Upload size/throughput for files / body_file steps: $upload.bytes_per_sec
+        if e == "$upload":
+            return resp.get("upload")
+        if e.startswith("$upload."):
+            return (resp.get("upload") or {}).get(e.split(".", 1)[1])
+        # body_generate: size / pattern / seed / sha256 of the synthetic request body
+        if e == "$generated":
+            return resp.get("generated")
+        if e.startswith("$generated."):
+            return (resp.get("generated") or {}).get(e.split(".", 1)[1])
+        # Server-Timing metrics / latency headers in ms: $server_timing.db
+        if e == "$server_timing":
+            return resp.get("server_timing") or {}
+        if e.startswith("$server_timing."):
+            return (resp.get("server_timing") or {}).get(e.split(".", 1)[1])
+        if e.startswith("$stream_records"):
+            # Kept sample of an ndjson / json_array stream: $stream_records[0].id
+            if e == "$stream_records":
+                return resp.get("stream_records")
+            return extract_from_body(resp, e[1:])
+        # Connection-level timings (httpstat): $timing.dns / $timing.ttfb / $timing.reused ...
+        if e == "$timing":
+            return resp.get("httpstat")
+        if e.startswith("$timing."):
+            return (resp.get("httpstat") or {}).get(e.split(".", 1)[1])
         
         # JSON body via JSONPath-like: $.a.b or $[0].id -> jmespath a.b / [0].id
-        body = resp.get("body")
+        body = self._body_value(resp)
         if e.startswith("$."):
             jexpr = e[2:]
             # For streaming responses, try extracting from full response first
@@ -190,6 +396,166 @@ class Runner:
         # Fallback: remove leading $ and try
         return extract_from_body(body, e.lstrip("$"))
 
+    def _record_client_span(
+        self,
+        trace_ctx: TraceContext,
+        endpoint: str,
+        req: Dict[str, Any],
+        resp: Optional[Dict[str, Any]],
+        error: Optional[str],
+        retries: int,
+        start_ns: int,
+        *,
+        case_name: str,
+        step_name: str,
+    ) -> None:
+        """CLIENT span whose id is the parent-id sent in this step's traceparent."""
+        assert self.tracer is not None
+        status_code = (resp or {}).get("status_code")
+        if error is None and isinstance(status_code, int) and status_code >= 400:
+            error = f"HTTP {status_code}"
+        self.tracer.add_span(
+            endpoint,
+            span_id=trace_ctx.span_id,
+            trace_id=trace_ctx.trace_id,
+            start_ns=start_ns,
+            end_ns=time.time_ns(),
+            kind=SPAN_KIND_CLIENT,
+            attributes={
+                "http.request.method": str(req.get("method") or "GET").upper(),
+                "url.full": (resp or {}).get("url") or req.get("path"),
+                "http.response.status_code": status_code,
+                "http.request.resend_count": retries or None,
+                "http.request.id": trace_ctx.request_id,
+                "drun.span.type": "http",
+                "drun.case": case_name,
+                "drun.step": step_name,
+            },
+            error=error,
+        )
+
+    # Phases measured directly; ttfb/body_read are sub-phases of "send"
+    _TOP_LEVEL_PHASES = ("render", "setup_hooks", "send", "extract", "validate", "teardown")  # throttle is part of send
+
+    @classmethod
+    def _finalize_timings(cls, timings: Dict[str, float], step_t0: float) -> Dict[str, float]:
+        """Round phase timings and attribute the unmeasured remainder of the step to 'overhead'."""
+        total = (time.perf_counter() - step_t0) * 1000.0
+        measured = sum(timings.get(k, 0.0) for k in cls._TOP_LEVEL_PHASES)
+        out = {k: round(v, 3) for k, v in timings.items() if v is not None}
+        out["overhead"] = round(max(total - measured, 0.0), 3)
+        out["total"] = round(total, 3)
+        return out
+
+    def _send_with_retry(
+        self, client: HTTPClient, req: Dict[str, Any], step: Step, record_checks: Optional[_RecordChecks] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], int]:
+        """Send a request honoring the step's retry policy and the run-wide retry budget.
+
+        Returns (response, error, retries). When retries on status are exhausted the last
+        response is returned so validators report the real status code. A legacy integer
+        ``retry: N`` keeps its original behavior: exception-only retries with a
+        deterministic ``min(retry_backoff * 2**n, 2.0)`` sleep, outside the retry budget.
+        """
+        policy = step.retry_policy()
+        legacy = not isinstance(step.retry, RetryPolicy)
+        base = policy.backoff if policy.backoff is not None else step.retry_backoff
+        attempt = 0
+        waited = 0.0
+        self.retry_budget.record_request()
+        while True:
+            resp_obj: Optional[Dict[str, Any]] = None
+            last_error: Optional[str] = None
+            try:
+                if record_checks is not None:
+                    record_checks.reset()
+                    resp_obj = client.request(req, on_record=record_checks)
+                else:
+                    resp_obj = client.request(req)
+            except CircuitOpenError as e:
+                # Host is known to be down: fail fast, never retry
+                if self.metrics is not None:
+                    self.metrics.inc("drun_request_errors_total", {"type": type(e).__name__})
+                return None, str(e), attempt
+            except Exception as e:
+                last_error = str(e)
+                if self.metrics is not None:
+                    self.metrics.inc("drun_request_errors_total", {"type": type(e).__name__})
+
+            if attempt >= policy.max_retries:
+                break
+            if last_error is not None:
+                if not policy.on_exception:
+                    break
+                reason = f"error={last_error}"
+            elif resp_obj is not None and resp_obj.get("status_code") in policy.on_status:
+                reason = f"status={resp_obj.get('status_code')}"
+            else:
+                break
+
+            if legacy:
+                delay = min(step.retry_backoff * (2 ** attempt), 2.0)
+                if self.log:
+                    self.log.info(f"[RETRY] attempt {attempt + 1}/{policy.max_retries} in {delay:.2f}s ({reason})")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            delay = full_jitter_backoff(attempt, base, policy.max_backoff)
+            if policy.respect_retry_after and resp_obj is not None:
+                retry_after = None
+                raw_retry_after = header_value(resp_obj.get("headers"), "Retry-After")
+                if raw_retry_after is not None:
+                    retry_after = parse_retry_after(raw_retry_after)
+                if retry_after is not None:
+                    delay = retry_after
+            if policy.max_total_delay is not None and waited + delay > policy.max_total_delay:
+                if self.log:
+                    self.log.warning(
+                        f"[RETRY] give up: next delay {delay:.2f}s exceeds max_total_delay={policy.max_total_delay}s ({reason})"
+                    )
+                break
+            if not self.retry_budget.try_acquire():
+                if self.log:
+                    self.log.warning(f"[RETRY] give up: run-wide retry budget exhausted ({reason})")
+                break
+            if self.log:
+                self.log.info(f"[RETRY] attempt {attempt + 1}/{policy.max_retries} in {delay:.2f}s ({reason})")
+            time.sleep(delay)
+            waited += delay
+            attempt += 1
+        return resp_obj, last_error, attempt
+
+    @staticmethod
+    def _cache_settings(case: Case, step: Step, req: Dict[str, Any]) -> Tuple[bool, Optional[float]]:
+        """Whether the step's response may come from the run-scoped cache, and its TTL."""
+        if str(req.get("method") or "GET").upper() not in CACHEABLE_METHODS or req.get("stream"):
+            return False, None
+        if isinstance(step.cache, ResponseCachePolicy):
+            return True, step.cache.ttl
+        if step.cache is not None:
+            return bool(step.cache), None
+        return bool(case.config.cache_get), None
+
+    def _send_cached(
+        self, client: HTTPClient, req: Dict[str, Any], step: Step, ttl: Optional[float]
+    ) -> Tuple[Tuple[Optional[Dict[str, Any]], Optional[str], int], bool]:
+        def _cacheable(result: Tuple[Optional[Dict[str, Any]], Optional[str], int]) -> bool:
+            resp, err, _ = result
+            return err is None and resp is not None and 200 <= int(resp.get("status_code") or 0) < 300
+
+        result, cached = self.response_cache.get_or_fetch(
+            ResponseCache.key_for(client, req),
+            ttl,
+            lambda: self._send_with_retry(client, req, step),
+            _cacheable,
+        )
+        if cached:
+            resp, err, _ = result
+            # Nothing went over the wire for this step
+            resp = {**resp, "timings": {}, "httpstat": {}, "elapsed_ms": 0.0}
+            result = (resp, err, 0)
+        return result, cached
+
     def _run_setup_hooks(
         self,
         names: List[str],
@@ -229,7 +595,8 @@ class Runner:
             fn_label = f"{m.group(1)}()" if m else text
             if self.log:
                 self.log.info(f"[HOOK] setup expr -> {fn_label}")
-            ret = self.templater.eval_expr(text, variables, fdict, envmap, extra_ctx=hook_ctx)
+            with self._hook_scope(fn_label, "setup"):
+                ret = self.templater.eval_expr(text, variables, fdict, envmap, extra_ctx=hook_ctx)
             if isinstance(ret, dict):
                 updated.update(ret)
         return updated
@@ -247,7 +614,10 @@ class Runner:
         updated: Dict[str, Any] = {}
         fdict = funcs or {}
         env_ctx = envmap or {}
+        resp = self._plain_response(resp)
         meta_data = {k: v for k, v in (meta or {}).items() if v is not None}
+        if meta_data.get("step_response"):
+            meta_data["step_response"] = self._plain_response(meta_data["step_response"])
         hook_ctx: Dict[str, Any] = {
             "response": resp,
             "variables": variables,
@@ -273,12 +643,90 @@ class Runner:
             fn_label = f"{m.group(1)}()" if m else text
             if self.log:
                 self.log.info(f"[HOOK] teardown expr -> {fn_label}")
-            ret = self.templater.eval_expr(text, variables, fdict, envmap, extra_ctx=hook_ctx)
+            with self._hook_scope(fn_label, "teardown"):
+                ret = self.templater.eval_expr(text, variables, fdict, envmap, extra_ctx=hook_ctx)
             if isinstance(ret, dict):
                 updated.update(ret)
         return updated
 
     def run_case(self, case: Case, global_vars: Dict[str, Any], params: Dict[str, Any], *, funcs: Dict[str, Any] | None = None, envmap: Dict[str, Any] | None = None, source: str | None = None) -> CaseInstanceResult:
+        name = case.config.name or "Unnamed Case"
+        span: Optional[Span] = None
+        if self.tracer is not None:
+            suite_key = source or name
+            suite_span = self.tracer.suite_span_id(
+                suite_key, f"suite {Path(suite_key).name}", {"drun.span.type": "suite", "drun.source": source}
+            )
+            span = self.tracer.start_span(
+                f"case {name}",
+                parent_span_id=suite_span,
+                attributes={
+                    "drun.span.type": "case",
+                    "drun.case": name,
+                    "drun.parameters": json.dumps(params, ensure_ascii=False, default=str) if params else None,
+                },
+            )
+        try:
+            result = self._run_case(case, global_vars, params, funcs=funcs, envmap=envmap, source=source)
+        except BaseException as e:
+            if span is not None:
+                span.end(error=str(e) or type(e).__name__)
+            raise
+        if self.metrics is not None:
+            self.metrics.inc("drun_cases_total", {"status": result.status})
+        if span is not None and self.tracer is not None:
+            span.attributes.update({"drun.status": result.status, "drun.steps": len(result.steps)})
+            span.end(error="case failed" if result.status == "failed" else None)
+            self.tracer.flush()
+        return result
+
+    def _span(self, name: str, **kwargs: Any) -> ContextManager[Any]:
+        """Child span of the current span when tracing is on, else a no-op."""
+        return self.tracer.span(name, **kwargs) if self.tracer is not None else nullcontext()
+
+    @contextmanager
+    def _hook_scope(self, fn_label: str, phase: str) -> Iterator[None]:
+        """Trace span and duration metric of one hook call."""
+        t0 = time.perf_counter()
+        try:
+            with self._span(f"hook {fn_label}", attributes={"drun.span.type": "hook", "drun.hook.phase": phase}):
+                yield
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("drun_hook_duration_seconds", {"hook": fn_label, "phase": phase}, time.perf_counter() - t0)
+
+    def _start_step_span(self, step_name: str) -> Optional[Span]:
+        if self.tracer is None:
+            return None
+        return self.tracer.start_span(f"step {step_name}", attributes={"drun.span.type": "step", "drun.step": step_name})
+
+    def _finish_step(self, case_name: str, step_name: str, span: Optional[Span], result: Optional[StepResult]) -> None:
+        """End the step span and record step metrics once the step's result is known.
+
+        Metrics are labeled with the step's template name (``step_name``), not the rendered
+        one, so parameterized steps like ``name: ref $i`` share one series.
+        """
+        if self.metrics is not None and result is not None:
+            labels = {"case": case_name, "step": step_name}
+            self.metrics.inc("drun_steps_total", {"case": case_name, "status": result.status})
+            failed_asserts = sum(1 for a in result.asserts or [] if not a.passed)
+            if failed_asserts:
+                self.metrics.inc("drun_assertion_failures_total", labels, failed_asserts)
+            # Only steps that got a response (request errors are counted by type instead)
+            if result.endpoint and result.response.get("status_code") is not None and not result.cached:
+                self.metrics.observe(
+                    "drun_step_duration_seconds", {**labels, "endpoint": result.endpoint}, (result.duration_ms or 0.0) / 1000.0
+                )
+            if result.endpoint and result.retries:
+                self.metrics.inc("drun_retries_total", {**labels, "endpoint": result.endpoint}, result.retries)
+        if span is None:
+            return
+        if result is not None:
+            span.name = f"step {result.name}"
+            span.attributes.update({"drun.step": result.name, "drun.status": result.status, "http.request.resend_count": result.retries or None})
+        span.end(error=(result.error or "step failed") if result is not None and result.status == "failed" else None)
+
+    def _run_case(self, case: Case, global_vars: Dict[str, Any], params: Dict[str, Any], *, funcs: Dict[str, Any] | None = None, envmap: Dict[str, Any] | None = None, source: str | None = None) -> CaseInstanceResult:
         name = case.config.name or "Unnamed Case"
         t0 = time.perf_counter()
         steps_results: List[StepResult] = []
@@ -291,7 +739,20 @@ class Runner:
         if not isinstance(rendered_base, dict):
             rendered_base = base_vars_raw
         ctx = VarContext(rendered_base)
-        client = self._build_client(case)
+        try:
+            client = self._build_client(case, source)
+        except Exception as e:
+            # e.g. config.app cannot be imported: fail this case, keep running the others
+            error = f"cannot load app {case.config.app!r}: {e}" if case.config.app else f"cannot create HTTP client: {e}"
+            if self.log:
+                self.log.error(f"[CASE] {name}: {error}")
+            steps_results.append(StepResult(name="case setup", status="failed", error=error))
+            total_ms = (time.perf_counter() - t0) * 1000.0
+            return CaseInstanceResult(name=name, parameters=params or {}, steps=steps_results, status="failed", duration_ms=total_ms, source=source)
+        step_span: Optional[Span] = None
+        # Unrendered name of the current step (metrics label)
+        step_label = ""
+        step_results_before = 0
 
         try:
             # Suite + Case setup hooks
@@ -342,6 +803,9 @@ class Runner:
                 raise
 
             for step in case.steps:
+                # A step ends at the next iteration (or after the loop), whichever path it took
+                self._finish_step(name, step_label, step_span, steps_results[-1] if len(steps_results) > step_results_before else None)
+                step_span = None
                 # skip handling
                 if step.skip:
                     if self.log:
@@ -349,6 +813,12 @@ class Runner:
                     steps_results.append(StepResult(name=step.name, status="skipped"))
                     continue
 
+                step_t0 = time.perf_counter()
+                timings: Dict[str, float] = {}
+                step_results_before = len(steps_results)
+                step_span = self._start_step_span(step.name)
+                step_label = step.name
+
                 # variables: case -> step -> CLI/global overrides
                 ctx.push(step.variables)
                 variables = ctx.get_merged(global_vars)
@@ -364,8 +834,17 @@ class Runner:
                     rendered_step_name = str(step.name)
 
                 # render request
-                req_dict = self._request_dict(step)
+                static_body = self._static_body(step)
+                req_dict = self._request_dict(step, exclude_body=static_body is not None)
                 req_rendered = self._render(req_dict, variables, funcs, envmap)
+                if static_body is not None:
+                    # Sent as-is; the original body is kept for logs and the report
+                    req_rendered["body"] = step.request.body
+                    req_rendered["encoded_body"] = static_body
+                if "stop_when" in req_dict:
+                    # Evaluated per stream event by the HTTP client, not a template
+                    req_rendered["stop_when"] = req_dict["stop_when"]
+                timings["render"] = (time.perf_counter() - step_t0) * 1000.0
                 step_locals_for_hook = rendered_locals if isinstance(rendered_locals, dict) else (step.variables or {})
                 session_vars_for_hook = variables
                 setup_meta = {
@@ -377,6 +856,7 @@ class Runner:
                     "session_env": envmap or {},
                 }
                 # run setup hooks (mutation allowed)
+                t_phase = time.perf_counter()
                 try:
                     new_vars = self._run_setup_hooks(
                         step.setup_hooks,
@@ -391,11 +871,20 @@ class Runner:
                         if self.log:
                             self.log.info(f"[HOOK] set var: {k} = {v!r}")
                     variables = ctx.get_merged(global_vars)
+                    timings["setup_hooks"] = (time.perf_counter() - t_phase) * 1000.0
                 except Exception as e:
                     status = "failed"
+                    timings["setup_hooks"] = (time.perf_counter() - t_phase) * 1000.0
                     if self.log:
                         self.log.error(f"[HOOK] setup error: {e}")
-                    steps_results.append(StepResult(name=rendered_step_name, status="failed", error=f"setup hook error: {e}"))
+                    steps_results.append(
+                        StepResult(
+                            name=rendered_step_name,
+                            status="failed",
+                            error=f"setup hook error: {e}",
+                            timings=self._finalize_timings(timings, step_t0),
+                        )
+                    )
                     if self.failfast:
                         break
                     ctx.pop()
@@ -417,6 +906,13 @@ class Runner:
                         hdrs["Authorization"] = f"Bearer {tok}"
                         req_rendered["headers"] = hdrs
 
+                endpoint = f"{str(req_rendered.get('method') or 'GET').upper()} {(step.request.path or '/').split('?', 1)[0]}"
+                trace_ctx: Optional[TraceContext] = None
+                if self.tracer is not None:
+                    trace_ctx = self.tracer.step_context(req_rendered.get("headers"))
+                    if self.tracer.inject:
+                        req_rendered["headers"] = self.tracer.inject_headers(req_rendered.get("headers"), trace_ctx)
+
                 if self.log:
                     self.log.info(f"[STEP] Start: {rendered_step_name}")
                     # brief request line
@@ -440,21 +936,31 @@ class Runner:
                         self.log.info(self._fmt_aligned("REQ", "data", self._fmt_json(data)))
 
                 # send with retry
-                last_error: Optional[str] = None
-                attempt = 0
-                resp_obj: Optional[Dict[str, Any]] = None
-                while attempt <= max(step.retry, 0):
-                    try:
-                        resp_obj = client.request(req_rendered)
-                        last_error = None
-                        break
-                    except Exception as e:
-                        last_error = str(e)
-                        if attempt >= step.retry:
-                            break
-                        backoff = min(step.retry_backoff * (2 ** attempt), 2.0)
-                        time.sleep(backoff)
-                        attempt += 1
+                t_phase = time.perf_counter()
+                send_start_ns = time.time_ns()
+                use_cache, cache_ttl = self._cache_settings(case, step, req_rendered)
+                from_cache = False
+                record_checks: Optional[_RecordChecks] = None
+                if use_cache:
+                    (resp_obj, last_error, attempt), from_cache = self._send_cached(client, req_rendered, step, cache_ttl)
+                    if from_cache and self.log:
+                        self.log.info(f"[CACHE] Response cache hit: {req_rendered.get('method', 'GET')} {req_rendered.get('path')}")
+                else:
+                    if step.record_validators and req_rendered.get("stream") in RECORD_STREAM_FORMATS:
+                        record_checks = _RecordChecks(
+                            self,
+                            step.record_validators,
+                            [self._render(v.expect, variables, funcs, envmap) for v in step.record_validators],
+                        )
+                    resp_obj, last_error, attempt = self._send_with_retry(client, req_rendered, step, record_checks)
+                timings["send"] = (time.perf_counter() - t_phase) * 1000.0
+                if resp_obj is not None:
+                    timings.update(resp_obj.get("timings") or {})
+                if trace_ctx is not None and trace_ctx.injected and not from_cache:
+                    self._record_client_span(
+                        trace_ctx, endpoint, req_rendered, resp_obj, last_error, attempt, send_start_ns,
+                        case_name=case.config.name or name, step_name=rendered_step_name,
+                    )
 
                 if last_error:
                     status = "failed"
@@ -465,7 +971,7 @@ class Runner:
                     req_summary = {
                         k: v
                         for k, v in (req_rendered or {}).items()
-                        if k in ("method", "path", "params", "headers", "body", "data")
+                        if k in ("method", "path", "params", "headers", "body", "data", "body_file", "body_generate")
                     }
                     # Build cURL even on error for better diagnostics
                     url_rendered = (req_rendered or {}).get("path")
@@ -493,6 +999,12 @@ class Runner:
                             curl=curl_cmd,
                             error=f"Request error: {last_error}",
                             duration_ms=0.0,
+                            timings=self._finalize_timings(timings, step_t0),
+                            retries=attempt,
+                            endpoint=endpoint,
+                            trace_id=trace_ctx.trace_id if trace_ctx else None,
+                            span_id=trace_ctx.span_id if trace_ctx else None,
+                            request_id=trace_ctx.request_id if trace_ctx else None,
                         )
                     )
                     if self.failfast:
@@ -504,24 +1016,61 @@ class Runner:
                 last_resp_obj = resp_obj
 
                 if self.log:
-                    hdrs = resp_obj.get("headers") or {}
+                    hdrs = headers_dict(resp_obj.get("headers"))
                     if not self.reveal:
                         hdrs = mask_headers(hdrs)
                     
                     # Check if streaming response
                     is_stream = resp_obj.get("is_stream", False)
-                    if is_stream:
+                    if resp_obj.get("stream_format") in RECORD_STREAM_FORMATS:
+                        stream_summary = resp_obj.get("stream_summary", {})
+                        self.log.info(
+                            f"[RESPONSE] status={resp_obj.get('status_code')} elapsed={resp_obj.get('elapsed_ms'):.1f}ms "
+                            f"({stream_summary.get('format')}: {stream_summary.get('record_count', 0)} records, "
+                            f"{stream_summary.get('records_per_sec', 0):.1f} records/s, parse errors: {stream_summary.get('parse_errors', 0)})"
+                        )
+                    elif is_stream:
                         stream_summary = resp_obj.get("stream_summary", {})
                         event_count = stream_summary.get("event_count", 0)
                         first_chunk_ms = stream_summary.get("first_chunk_ms", 0)
-                        self.log.info(f"[RESPONSE] status={resp_obj.get('status_code')} elapsed={resp_obj.get('elapsed_ms'):.1f}ms (streaming: {event_count} events, first chunk: {first_chunk_ms:.1f}ms)")
+                        self.log.info(
+                            f"[RESPONSE] status={resp_obj.get('status_code')} elapsed={resp_obj.get('elapsed_ms'):.1f}ms "
+                            f"(streaming: {event_count} events, first chunk: {first_chunk_ms:.1f}ms, "
+                            f"gap p95: {stream_summary.get('gap_p95_ms', 0):.1f}ms, stalls: {stream_summary.get('stalls', 0)})"
+                        )
                     else:
                         self.log.info(f"[RESPONSE] status={resp_obj.get('status_code')} elapsed={resp_obj.get('elapsed_ms'):.1f}ms")
                     
+                    up = resp_obj.get("upload")
+                    if up:
+                        self.log.info(
+                            f"[UPLOAD] {str(up.get('files')) + ' file(s), ' if up.get('files') else ''}"
+                            f"{up.get('bytes')} bytes in {up.get('upload_ms', 0):.1f}ms "
+                            f"({up.get('bytes_per_sec', 0) / 1048576:.1f} MiB/s)"
+                        )
+
+                    st = resp_obj.get("server_timing")
+                    if st:
+                        self.log.info(
+                            "[SERVER-TIMING] " + " ".join(f"{k}={v:.1f}ms" for k, v in st.items())
+                        )
+
+                    hs = resp_obj.get("httpstat") or {}
+                    if hs:
+                        self.log.debug(
+                            "[HTTPSTAT] dns=%.1fms connect=%.1fms tls=%.1fms send=%.1fms ttfb=%.1fms download=%.1fms reused=%s",
+                            hs.get("dns", 0.0), hs.get("connect", 0.0), hs.get("tls", 0.0), hs.get("send", 0.0),
+                            hs.get("ttfb", 0.0), hs.get("download", 0.0), hs.get("reused"),
+                        )
+
                     if self.log_response_headers:
                         self.log.info(self._fmt_aligned("RESP", "headers", self._fmt_json(hdrs)))
                     
-                    if is_stream:
+                    if resp_obj.get("stream_format") in RECORD_STREAM_FORMATS:
+                        records = resp_obj.get("stream_records") or []
+                        if records:
+                            self.log.info(self._fmt_aligned("STREAM", "first record", self._fmt_json(records[0] if self.reveal else mask_body(records[0]))))
+                    elif is_stream:
                         # For streaming, show summary instead of full events
                         stream_events = resp_obj.get("stream_events", [])
                         if stream_events:
@@ -536,7 +1085,20 @@ class Runner:
                     else:
                         # Regular response body logging
                         body_preview = resp_obj.get("body")
-                        if isinstance(body_preview, (dict, list)):
+                        if not isinstance(body_preview, SpooledBody):
+                            body_preview = body_value(body_preview)
+                        if resp_obj.get("download") and body_preview is None:
+                            dl = resp_obj["download"]
+                            self.log.info(
+                                f"[RESP] download {dl.get('body_size')} bytes sha256={dl.get('body_sha256')} prefix={dl.get('body_prefix')}"
+                            )
+                        elif isinstance(body_preview, SpooledBody):
+                            where = "spooled to disk" if body_preview.path else "truncated"
+                            self.log.info(
+                                f"[RESP] body {body_preview.size} bytes {where} (sha256={body_preview.sha256[:16]}...)"
+                            )
+                            self.log.info(self._fmt_aligned("RESP", "preview", body_preview.preview_text()))
+                        elif isinstance(body_preview, (dict, list)):
                             out_body = body_preview
                             if not self.reveal:
                                 out_body = mask_body(out_body)
@@ -548,6 +1110,7 @@ class Runner:
                             self.log.info(self._fmt_aligned("RESP", "text", text))
 
                 # extracts ($-only syntax) - moved before validation to allow using extracted vars in validate
+                t_phase = time.perf_counter()
                 extracts: Dict[str, Any] = {}
                 for var, expr in (step.extract or {}).items():
                     val = self._eval_extract(expr, resp_obj)
@@ -557,12 +1120,17 @@ class Runner:
                         self.log.info(f"[EXTRACT] {var} = {val!r} from {expr}")
                 # Update variables after extraction so validate can use them
                 variables = ctx.get_merged(global_vars)
+                timings["extract"] = (time.perf_counter() - t_phase) * 1000.0
 
                 # assertions
+                t_phase = time.perf_counter()
                 assertions: List[AssertionResult] = []
                 step_failed = False
                 for v in step.validators:
-                    rendered_check = self._render(v.check, variables, funcs, envmap)
+                    if self._is_response_ref(v.check, variables):
+                        rendered_check = v.check.strip()
+                    else:
+                        rendered_check = self._render(v.check, variables, funcs, envmap)
                     # If rendered_check is not a string, it's already a value (e.g., extracted variable)
                     # Use it directly as actual instead of trying to resolve from response
                     if not isinstance(rendered_check, str):
@@ -605,9 +1173,22 @@ class Runner:
                             actual_fmt = self._format_log_value(actual, prefix_len=indent_len)
                             self.log.info(prefix + actual_fmt + " | PASS")
 
+                if record_checks is not None:
+                    for ar in record_checks.results():
+                        assertions.append(ar)
+                        if not ar.passed:
+                            step_failed = True
+                        if self.log:
+                            if ar.passed:
+                                self.log.info(f"[VALIDATION] {ar.check} {ar.comparator} {ar.expect!r} => {ar.actual} | PASS")
+                            else:
+                                self.log.error(f"[VALIDATION] {ar.check} {ar.comparator} {ar.expect!r} => {ar.actual} | FAIL | {ar.message}")
+
                 # Built-in SQL validation has been removed; any SQL checks should run via hooks.
+                timings["validate"] = (time.perf_counter() - t_phase) * 1000.0
 
                 # teardown hooks
+                t_phase = time.perf_counter()
                 try:
                     teardown_meta = {
                         "step_name": step.name,
@@ -635,9 +1216,12 @@ class Runner:
                     step_failed = True
                     if self.log:
                         self.log.error(f"[HOOK] teardown error: {e}")
+                timings["teardown"] = (time.perf_counter() - t_phase) * 1000.0
 
                 # build result
                 body_masked = resp_obj.get("body")
+                if not isinstance(body_masked, SpooledBody):
+                    body_masked = body_value(body_masked)
                 if not self.reveal:
                     body_masked = mask_body(body_masked)
 
@@ -647,7 +1231,13 @@ class Runner:
                 }
 
                 # Check if streaming response
-                if resp_obj.get("is_stream"):
+                if resp_obj.get("stream_format") in RECORD_STREAM_FORMATS:
+                    # Record streams: the kept sample is the body, plus the stream summary
+                    response_dict["is_stream"] = True
+                    response_dict["stream_format"] = resp_obj.get("stream_format")
+                    response_dict["body"] = body_masked
+                    response_dict["stream_summary"] = resp_obj.get("stream_summary", {})
+                elif resp_obj.get("is_stream"):
                     response_dict["is_stream"] = True
                     response_dict["stream_events"] = resp_obj.get("stream_events", [])
                     response_dict["stream_summary"] = resp_obj.get("stream_summary", {})
@@ -662,6 +1252,10 @@ class Runner:
                                 masked_event["data"] = mask_body(masked_event["data"])
                             masked_events.append(masked_event)
                         response_dict["stream_events"] = masked_events
+                elif isinstance(body_masked, SpooledBody):
+                    # Over max_body_bytes: the report keeps a preview plus size and digest
+                    response_dict["body"] = body_masked.preview_text() + "..."
+                    response_dict["body_info"] = body_masked.describe()
                 else:
                     # Regular response body
                     if isinstance(body_masked, (dict, list)):
@@ -680,6 +1274,13 @@ class Runner:
                         text = str(body_masked)
                         response_dict["body"] = text if len(text) <= 2048 else text[:2048] + "..."
 
+                if resp_obj.get("download"):
+                    response_dict["download"] = resp_obj.get("download")
+                if resp_obj.get("upload"):
+                    response_dict["upload"] = resp_obj.get("upload")
+                if resp_obj.get("generated"):
+                    response_dict["generated"] = resp_obj.get("generated")
+
                 # Build curl command for the step (always available in report)
                 url_rendered = resp_obj.get("url") or req_rendered.get("path")
                 curl_headers = req_rendered.get("headers") or {}
@@ -703,14 +1304,24 @@ class Runner:
                     request={
                         k: v
                         for k, v in req_rendered.items()
-                        if k in ("method", "path", "url", "params", "headers", "body", "data")
+                        if k in ("method", "path", "url", "params", "headers", "body", "data", "body_file", "body_generate")
                     },
                     response=response_dict,
                     curl=curl,
                     asserts=assertions,
                     extracts=extracts,
                     duration_ms=resp_obj.get("elapsed_ms") or 0.0,
+                    timings=self._finalize_timings(timings, step_t0),
+                    httpstat=resp_obj.get("httpstat") or {},
+                    retries=attempt,
+                    cached=from_cache,
+                    server_timing=resp_obj.get("server_timing") or {},
+                    endpoint=endpoint,
+                    trace_id=trace_ctx.trace_id if trace_ctx else None,
+                    span_id=trace_ctx.span_id if trace_ctx else None,
+                    request_id=trace_ctx.request_id if trace_ctx else None,
                 )
+                sr._stream_gaps = resp_obj.get("stream_gaps")
                 steps_results.append(sr)
                 if step_failed:
                     status = "failed"
@@ -720,14 +1331,13 @@ class Runner:
                     if self.log:
                         self.log.info(f"[STEP] Result: {rendered_step_name} | PASSED")
 
-                # httpstat 输出已移除
-
                 if step_failed and self.failfast:
                     ctx.pop()
                     break
                 ctx.pop()
 
         finally:
+            self._finish_step(name, step_label, step_span, steps_results[-1] if len(steps_results) > step_results_before else None)
             # Suite + Case teardown hooks (best-effort)
             try:
                 if getattr(case, "teardown_hooks", None):
@@ -784,8 +1394,16 @@ class Runner:
         step_total = 0
         step_failed = 0
         step_skipped = 0
+        timing_totals: Dict[str, float] = {}
+        server_samples: List[Dict[str, Any]] = []
         for case in results:
             for step in case.steps or []:
+                if step.server_timing and step.endpoint and not step.cached:
+                    server_samples.append(
+                        {"endpoint": step.endpoint, "client_ms": step.duration_ms, "metrics": step.server_timing}
+                    )
+                for phase, ms in (step.timings or {}).items():
+                    timing_totals[phase] = timing_totals.get(phase, 0.0) + float(ms or 0.0)
                 step_total += 1
                 if step.status == "failed":
                     step_failed += 1
@@ -810,6 +1428,29 @@ class Runner:
                     "steps_skipped": step_skipped,
                 }
             )
+        retry_stats = self.retry_budget.stats()
+        if retry_stats["retries"] or retry_stats["budget_denied"]:
+            summary["retries"] = retry_stats
+        if self.breakers is not None:
+            breaker_stats = self.breakers.stats()
+            if breaker_stats:
+                summary["circuit_breaker"] = breaker_stats
+        limiter_stats = self.rate_limiter.stats()
+        if limiter_stats["limits"] or limiter_stats["case_limits"]:
+            summary["rate_limit"] = limiter_stats
+        if self.cassette is not None:
+            summary["cassette"] = self.cassette.stats()
+        if timing_totals:
+            summary["timings"] = {k: round(v, 3) for k, v in timing_totals.items()}
+        server_timing = aggregate_server_timing(server_samples)
+        if server_timing:
+            summary["server_timing"] = server_timing
+        rc = self.response_cache.stats()
+        if rc["hits"] or rc["coalesced"] or rc["entries"]:
+            summary["response_cache"] = rc
+        hook_cache = cache_stats()
+        if hook_cache:
+            summary["hook_cache"] = hook_cache
 
         return RunReport(
             summary=summary,
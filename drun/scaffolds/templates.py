@@ -1303,6 +1303,7 @@ reports/
 logs/
 allure-results/
 *.log
+.drun_cache/
 
 # 环境配置（包含敏感信息）
 .env
@@ -106,6 +106,20 @@ def _safe_eval(node: ast.AST, ctx: Dict[str, Any]) -> Any:
     raise ValueError("Unsupported expression in template")
 
 
+def compile_expression(expr: str) -> Callable[[Dict[str, Any]], Any]:
+    """Parse a restricted expression once so it can be evaluated many times (e.g. per stream event).
+
+    ``$name`` / ``${...}`` wrappers are accepted like in ``TemplateEngine.eval_expr``; a
+    syntax error is raised immediately instead of being swallowed.
+    """
+    text = expr.strip()
+    if text.startswith("${") and text.endswith("}"):
+        text = text[2:-1]
+    text = re.sub(r"\$([A-Za-z_][A-Za-z0-9_]*)", r"\1", text)
+    node = ast.parse(text, mode="eval")
+    return lambda ctx: _safe_eval(node, {**BUILTINS, **ctx})
+
+
 def _render_text_without_jinja(text: str, ctx: Dict[str, Any]) -> str:
     # Only process ${...} tokens; leave any other braces untouched
     out: list[str] = []
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from drun.utils.logging import get_logger
+
+_SCOPES = ("run", "disk")
+DEFAULT_CACHE_DIRNAME = ".drun_cache"
+_DB_FILENAME = "hooks.sqlite3"
+
+_log = get_logger("drun.cache")
+
+# All memoized hook functions created in this process (used for run summary stats)
+_REGISTRY: List["HookCache"] = []
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _canonical(value: Any) -> str:
+    """Process-independent text form of an argument (dict keys and set members sorted).
+
+    Unlike pickle or plain repr, the result does not depend on hash randomization, so
+    ``{"b", "a"}`` gives the same disk cache key in every run.
+    """
+    if isinstance(value, dict):
+        items = sorted(f"{_canonical(k)}: {_canonical(v)}" for k, v in value.items())
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, (set, frozenset)):
+        return f"{type(value).__name__}({{{', '.join(sorted(_canonical(v) for v in value))}}})"
+    if isinstance(value, list):
+        return "[" + ", ".join(_canonical(v) for v in value) + "]"
+    if isinstance(value, tuple):
+        return "(" + ", ".join(_canonical(v) for v in value) + ",)"
+    return repr(value)
+
+
+def _make_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+    raw = _canonical((args, kwargs)).encode("utf-8", errors="replace")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _func_identity(func: Callable[..., Any]) -> str:
+    """``<source file>:<module>.<qualname>``: same-named hooks of different files never share entries."""
+    code = getattr(func, "__code__", None)
+    source = os.path.abspath(code.co_filename) if code is not None else "?"
+    name = getattr(func, "__qualname__", getattr(func, "__name__", "hook"))
+    return f"{source}:{getattr(func, '__module__', '?')}.{name}"
+
+
+# One sqlite connection per cache database, shared by every disk-scoped hook of the process
+_CONNECTIONS: Dict[str, sqlite3.Connection] = {}
+_DB_LOCK = threading.Lock()
+
+
+def _connection(path: Path) -> sqlite3.Connection:
+    """Open (once) the cache database at ``path``; callers must hold ``_DB_LOCK``."""
+    key = str(path)
+    conn = _CONNECTIONS.get(key)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(key, timeout=5.0, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS hook_cache ("
+            " func TEXT NOT NULL, key TEXT NOT NULL, expires REAL, value BLOB NOT NULL,"
+            " PRIMARY KEY (func, key))"
+        )
+        conn.commit()
+        _CONNECTIONS[key] = conn
+    return conn
+
+
+def _close_connections() -> None:
+    with _DB_LOCK:
+        for conn in _CONNECTIONS.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _CONNECTIONS.clear()
+
+
+atexit.register(_close_connections)
+
+
+class HookCache:
+    """Memo store attached to a single hook function.
+
+    - scope="run": in-memory only, lives as long as the drun process.
+    - scope="disk": sqlite store shared across runs (and processes), located in
+      ``<hooks dir>/.drun_cache`` once the hooks file is loaded by ``get_functions_for``.
+    """
+
+    def __init__(self, func: Callable[..., Any], *, ttl: Optional[float], scope: str) -> None:
+        self.func = func
+        self.name = getattr(func, "__qualname__", getattr(func, "__name__", "hook"))
+        # Row owner in the disk store (module/file identity, not just the function name)
+        self.func_id = _func_identity(func)
+        self.ttl = float(ttl) if ttl is not None else None
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+        self._memory: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._lock = threading.RLock()
+        self._disk_dir: Optional[Path] = None
+
+    # ---- wiring ----
+    def bind(self, directory: Path) -> None:
+        """Set the on-disk location (called by the hooks loader)."""
+        override = os.environ.get("DRUN_CACHE_DIR")
+        self._disk_dir = Path(override) if override else Path(directory) / DEFAULT_CACHE_DIRNAME
+
+    def _db_path(self) -> Path:
+        base = self._disk_dir or (Path.cwd() / DEFAULT_CACHE_DIRNAME)
+        return base / _DB_FILENAME
+
+    # ---- storage ----
+    def _expires_at(self) -> Optional[float]:
+        return (time.time() + self.ttl) if self.ttl is not None else None
+
+    def _get(self, key: str) -> Tuple[bool, Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    return True, value
+                self._memory.pop(key, None)
+        if self.scope != "disk":
+            return False, None
+        try:
+            with _DB_LOCK:
+                row = _connection(self._db_path()).execute(
+                    "SELECT expires, value FROM hook_cache WHERE func = ? AND key = ?",
+                    (self.func_id, key),
+                ).fetchone()
+        except Exception as e:
+            _log.debug("[CACHE] disk read failed for %s: %s", self.name, e)
+            return False, None
+        if row is None:
+            return False, None
+        expires, blob = row
+        if expires is not None and expires <= now:
+            return False, None
+        try:
+            value = pickle.loads(blob)
+        except Exception:
+            return False, None
+        with self._lock:
+            self._memory[key] = (expires, value)
+        return True, value
+
+    def _put(self, key: str, value: Any) -> None:
+        expires = self._expires_at()
+        with self._lock:
+            self._memory[key] = (expires, value)
+        if self.scope != "disk":
+            return
+        try:
+            blob = pickle.dumps(value, protocol=4)
+        except Exception as e:
+            _log.debug("[CACHE] %s result is not picklable; kept in memory only: %s", self.name, e)
+            return
+        try:
+            with _DB_LOCK:
+                conn = _connection(self._db_path())
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO hook_cache (func, key, expires, value) VALUES (?, ?, ?, ?)",
+                        (self.func_id, key, expires, blob),
+                    )
+        except Exception as e:
+            _log.debug("[CACHE] disk write failed for %s: %s", self.name, e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.scope == "disk":
+            try:
+                with _DB_LOCK:
+                    conn = _connection(self._db_path())
+                    with conn:
+                        conn.execute("DELETE FROM hook_cache WHERE func = ?", (self.func_id,))
+            except Exception:
+                pass
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key = _make_key(args, kwargs)
+        found, value = self._get(key)
+        if found:
+            with self._lock:
+                self.hits += 1
+            _log.debug("[CACHE] hit %s%r", self.name, args)
+            return value
+        with self._lock:
+            self.misses += 1
+        value = self.func(*args, **kwargs)
+        self._put(key, value)
+        return value
+
+
+def cache(func: Optional[Callable[..., Any]] = None, *, ttl: Optional[float] = None, scope: str = "run") -> Any:
+    """Memoize a hook function by its arguments.
+
+    Usage in drun_hooks.py::
+
+        import drun
+
+        @drun.cache(ttl=300)                 # in-memory for this run
+        def hook_query_user_email(user_id): ...
+
+        @drun.cache(ttl=3600, scope="disk")  # shared across runs
+        def hook_query_product_name(product_id): ...
+
+    Exceptions are never cached. ``ttl=None`` keeps entries until the run ends
+    (scope="run") or forever (scope="disk").
+    """
+    if scope not in _SCOPES:
+        raise ValueError(f"Invalid cache scope {scope!r}; expected one of: {', '.join(_SCOPES)}")
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        store = HookCache(fn, ttl=ttl, scope=scope)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return store(*args, **kwargs)
+
+        wrapper.__drun_cache__ = store  # type: ignore[attr-defined]
+        with _REGISTRY_LOCK:
+            _REGISTRY.append(store)
+        return wrapper
+
+    if func is not None and callable(func):
+        return decorate(func)
+    return decorate
+
+
+def get_cache_store(func: Any) -> Optional[HookCache]:
+    """Return the HookCache behind a function decorated with ``@drun.cache``."""
+    return getattr(func, "__drun_cache__", None)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Aggregate hit/miss counters of all memoized hooks that were called."""
+    with _REGISTRY_LOCK:
+        stores = list(_REGISTRY)
+    functions: Dict[str, Dict[str, int]] = {}
+    hits = misses = 0
+    for st in stores:
+        if not (st.hits or st.misses):
+            continue
+        entry = functions.setdefault(st.name, {"hits": 0, "misses": 0})
+        entry["hits"] += st.hits
+        entry["misses"] += st.misses
+        hits += st.hits
+        misses += st.misses
+    if not functions:
+        return {}
+    return {"hits": hits, "misses": misses, "functions": functions}
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from drun.utils.logging import get_logger
+
+_log = get_logger("drun.metrics")
+
+# Histogram buckets in seconds (HTTP steps, hooks and DB queries)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds between textfile rewrites / Pushgateway pushes during a run
+DEFAULT_INTERVAL = 15.0
+
+# name -> (type, help)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "drun_step_duration_seconds": ("histogram", "HTTP step latency by case, step and endpoint."),
+    "drun_steps_total": ("counter", "Finished steps by case and status."),
+    "drun_assertion_failures_total": ("counter", "Failed assertions by case and step."),
+    "drun_retries_total": ("counter", "Request retries by case, step and endpoint."),
+    "drun_request_errors_total": ("counter", "Failed request attempts (no response) by error type."),
+    "drun_cases_total": ("counter", "Finished case instances by status."),
+    "drun_hook_duration_seconds": ("histogram", "Setup/teardown hook duration by hook and phase."),
+    "drun_db_query_duration_seconds": ("histogram", "DB query time by database, role and operation."),
+    "drun_run_duration_seconds": ("gauge", "Wall time of the run so far."),
+    "drun_run_start_time_seconds": ("gauge", "Unix time the run started."),
+    "drun_run_in_progress": ("gauge", "1 while the run is in progress, 0 once it finished."),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((k, "" if v is None else str(v)) for k, v in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms of a run in the Prometheus text exposition format.
+
+    No client library needed: ``render()`` produces what the node-exporter textfile
+    collector and the Pushgateway accept. Thread-safe (workers record concurrently).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.start_time = time.time()
+        self._t0 = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> (bucket counts, sum, count)
+        self._histograms: Dict[str, Dict[LabelKey, Tuple[list, float, int]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1.0) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 0.0) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, labels: Optional[Dict[str, Any]], seconds: float) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts, total, count = series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            series[key] = (counts, total + seconds, count + 1)
+
+    def finish(self) -> None:
+        """Freeze the run duration and mark the run as no longer in progress."""
+        self._finished = time.perf_counter() - self._t0
+
+    def render(self) -> str:
+        elapsed = self._finished if self._finished is not None else time.perf_counter() - self._t0
+        self.set("drun_run_duration_seconds", None, elapsed)
+        self.set("drun_run_start_time_seconds", None, self.start_time)
+        self.set("drun_run_in_progress", None, 0.0 if self._finished is not None else 1.0)
+        lines = []
+        with self._lock:
+            for name, (mtype, help_text) in METRICS.items():
+                if mtype == "histogram":
+                    series_h = self._histograms.get(name)
+                    if not series_h:
+                        continue
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                    for key, (counts, total, count) in sorted(series_h.items()):
+                        for bound, n in zip(self.buckets, counts):
+                            lines.append(f"{name}_bucket{_fmt_labels(key, ('le', _fmt_value(bound)))} {n}")
+                        lines.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {count}")
+                        lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(round(total, 6))}")
+                        lines.append(f"{name}_count{_fmt_labels(key)} {count}")
+                    continue
+                series = (self._counters if mtype == "counter" else self._gauges).get(name)
+                if not series:
+                    continue
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {mtype}"]
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str | Path) -> None:
+        """Atomic write (temp file + rename) so the textfile collector never reads a partial file."""
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{p.name}.", dir=str(p.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, p)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def push(self, url: str, *, job: str = "drun", timeout: float = 10.0) -> None:
+        """PUT the metrics to a Pushgateway (replacing the group of the previous push)."""
+        target = url.rstrip("/")
+        if "/metrics/job/" not in target:
+            target = f"{target}/metrics/job/{job}"
+        resp = httpx.put(
+            target,
+            content=self.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4"},
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+
+
+class MetricsExporter:
+    """Rewrites the textfile and/or pushes to a Pushgateway every ``interval`` seconds.
+
+    Export failures are logged and retried at the next interval; ``stop()`` performs the
+    final export after the run finished.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        *,
+        path: Optional[str] = None,
+        push_url: Optional[str] = None,
+        interval: float = DEFAULT_INTERVAL,
+    ) -> None:
+        self.registry = registry
+        self.path = path
+        self.push_url = push_url
+        self.interval = max(float(interval), 1.0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.export()
+        self._thread = threading.Thread(target=self._loop, name="drun-metrics", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self) -> None:
+        if self.path:
+            try:
+                self.registry.write_textfile(self.path)
+            except OSError as e:
+                _log.warning("[METRICS] cannot write %s: %s", self.path, e)
+        if self.push_url:
+            try:
+                self.registry.push(self.push_url)
+            except httpx.HTTPError as e:
+                _log.warning("[METRICS] push to %s failed: %s", self.push_url, e)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.registry.finish()
+        self.export()
+
+
+# Registry of the running `drun run` (used by code without access to the runner, e.g. the DB proxy)
+_ACTIVE: Optional[MetricsRegistry] = None
+
+
+def set_active_metrics(registry: Optional[MetricsRegistry]) -> None:
+    global _ACTIVE
+    _ACTIVE = registry
+
+
+def active_metrics() -> Optional[MetricsRegistry]:
+    return _ACTIVE
@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import re
+import secrets
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Mapping, Optional, TextIO
+
+from drun import __version__
+
+# OTLP SpanKind / StatusCode values (opentelemetry-proto)
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Finished spans are appended to the trace file in batches of this size, or after this long
+FLUSH_SPANS = 256
+FLUSH_INTERVAL_S = 1.0
+
+_TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Span id of the innermost open span in this thread / context (parent of new spans)
+_CURRENT_SPAN: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("drun_current_span", default=None)
+# Tracer of the running `drun run` (used by code without access to the runner, e.g. the DB proxy)
+_ACTIVE: Optional["Tracer"] = None
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool = True) -> str:
+    """W3C Trace Context header: ``00-<trace-id>-<parent-id>-<flags>``."""
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Dict[str, str]]:
+    """``{"trace_id", "span_id"}`` of a valid traceparent, else None (all-zero ids are invalid)."""
+    m = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not m or m.group(1) == "ff" or set(m.group(2)) == {"0"} or set(m.group(3)) == {"0"}:
+        return None
+    return {"trace_id": m.group(2), "span_id": m.group(3)}
+
+
+@dataclass
+class TraceContext:
+    """Ids sent with one step: the backend sees ``span_id`` as the parent of its server span."""
+
+    trace_id: str
+    span_id: str
+    request_id: Optional[str]
+    # False when the step set its own traceparent (ids recorded, no client span emitted)
+    injected: bool = True
+
+
+def _header(headers: Mapping[str, Any], name: str) -> Optional[str]:
+    lowered = name.lower()
+    for key, val in headers.items():
+        if key.lower() == lowered:
+            return val if isinstance(val, str) else None
+    return None
+
+
+def _attr_value(value: Any) -> Dict[str, Any]:
+    # OTLP/JSON AnyValue; int64 is encoded as a decimal string
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_attributes(attributes: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _attr_value(v)} for k, v in attributes.items() if v is not None]
+
+
+class Span:
+    """An open span; ``end()`` records it (and restores the previous current span)."""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        *,
+        kind: int,
+        attributes: Optional[Mapping[str, Any]],
+        parent_span_id: Optional[str],
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.span_id = new_span_id()
+        self.parent_span_id = parent_span_id or current_span_id() or tracer.root_span_id
+        self.start_ns = time.time_ns()
+        self._token = _CURRENT_SPAN.set(self.span_id)
+        self._ended = False
+
+    def end(self, error: Optional[str] = None) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        try:
+            _CURRENT_SPAN.reset(self._token)
+        except ValueError:
+            # Ended from another context; leave that context's current span alone
+            pass
+        self.tracer.add_span(
+            self.name,
+            span_id=self.span_id,
+            start_ns=self.start_ns,
+            end_ns=time.time_ns(),
+            parent_span_id=self.parent_span_id,
+            kind=self.kind,
+            attributes=self.attributes,
+            error=error,
+        )
+
+
+def current_span_id() -> Optional[str]:
+    return _CURRENT_SPAN.get()
+
+
+class Tracer:
+    """Run-level trace: one trace id and a span tree rooted at the run.
+
+    Spans are written as OTLP/JSON ``TracesData`` documents, one JSON object per line (the
+    format of the OpenTelemetry Collector file exporter and ``otlpjsonfile`` receiver), so
+    trace viewers can import the file and drun timings can be joined with backend traces
+    on the propagated trace id. Finished spans are appended while the run is in progress;
+    the run and suite spans are written by ``close()``. Thread-safe: concurrent workers
+    record spans into the same trace.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None, *, inject: bool = True, service_name: str = "drun") -> None:
+        self.path = Path(path) if path is not None else None
+        self.inject = inject
+        self.service_name = service_name
+        self.trace_id = new_trace_id()
+        self.root_span_id = new_span_id()
+        self.start_ns = time.time_ns()
+        self.span_count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._suites: Dict[str, Dict[str, Any]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._fh: Optional[TextIO] = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "w", encoding="utf-8")
+
+    # ---- trace context propagation ----
+    def step_context(self, headers: Optional[Mapping[str, Any]]) -> TraceContext:
+        """Ids for one step, reusing a traceparent / x-request-id the step already sets."""
+        headers = headers or {}
+        request_id = _header(headers, "x-request-id") or (str(uuid.uuid4()) if self.inject else None)
+        existing = _header(headers, "traceparent")
+        if existing is not None:
+            parsed = parse_traceparent(existing)
+            if parsed is not None:
+                return TraceContext(parsed["trace_id"], parsed["span_id"], request_id, injected=False)
+        return TraceContext(self.trace_id, new_span_id(), request_id)
+
+    def inject_headers(self, headers: Optional[Mapping[str, Any]], ctx: TraceContext) -> Dict[str, Any]:
+        """Copy of ``headers`` with ``traceparent`` and ``x-request-id`` added when missing."""
+        out = dict(headers or {})
+        if ctx.injected and _header(out, "traceparent") is None:
+            out["traceparent"] = format_traceparent(ctx.trace_id, ctx.span_id)
+        if ctx.request_id and _header(out, "x-request-id") is None:
+            out["x-request-id"] = ctx.request_id
+        return out
+
+    # ---- spans ----
+    def start_span(
+        self,
+        name: str,
+        *,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Mapping[str, Any]] = None,
+        parent_span_id: Optional[str] = None,
+    ) -> Span:
+        """Open a span that becomes the parent of spans started in this context until it ends."""
+        return Span(self, name, kind=kind, attributes=attributes, parent_span_id=parent_span_id)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        *,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Mapping[str, Any]] = None,
+        parent_span_id: Optional[str] = None,
+    ) -> Iterator[Span]:
+        s = self.start_span(name, kind=kind, attributes=attributes, parent_span_id=parent_span_id)
+        try:
+            yield s
+        except BaseException as e:
+            s.attributes.setdefault("error.type", type(e).__name__)
+            s.end(error=str(e) or type(e).__name__)
+            raise
+        s.end()
+
+    def suite_span_id(self, key: str, name: str, attributes: Optional[Mapping[str, Any]] = None) -> str:
+        """Span grouping the case instances of one suite / file; it ends with its last case."""
+        with self._lock:
+            suite = self._suites.get(key)
+            if suite is None:
+                now = time.time_ns()
+                suite = {"span_id": new_span_id(), "name": name, "start_ns": now, "end_ns": now, "attributes": dict(attributes or {})}
+                self._suites[key] = suite
+            return suite["span_id"]
+
+    def add_span(
+        self,
+        name: str,
+        *,
+        span_id: str,
+        start_ns: int,
+        end_ns: int,
+        parent_span_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Mapping[str, Any]] = None,
+        error: Optional[str] = None,
+        trace_id: Optional[str] = None,
+    ) -> None:
+        """Record a finished span (parent: the current span, else the run span)."""
+        parent = parent_span_id if parent_span_id is not None else (current_span_id() or self.root_span_id)
+        span = self._span_dict(
+            name, trace_id or self.trace_id, span_id, parent, start_ns, end_ns, kind, attributes or {}, error
+        )
+        with self._lock:
+            for suite in self._suites.values():
+                if suite["span_id"] == parent:
+                    suite["end_ns"] = max(suite["end_ns"], end_ns)
+            self._buffer.append(span)
+            self.span_count += 1
+            if len(self._buffer) >= FLUSH_SPANS or time.monotonic() - self._last_flush >= FLUSH_INTERVAL_S:
+                self._flush_locked()
+
+    @staticmethod
+    def _span_dict(
+        name: str,
+        trace_id: str,
+        span_id: str,
+        parent_span_id: str,
+        start_ns: int,
+        end_ns: int,
+        kind: int,
+        attributes: Mapping[str, Any],
+        error: Optional[str],
+    ) -> Dict[str, Any]:
+        return {
+            "traceId": trace_id,
+            "spanId": span_id,
+            "parentSpanId": parent_span_id,
+            "name": name,
+            "kind": kind,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(max(end_ns, start_ns)),
+            "attributes": otlp_attributes(attributes),
+            "status": {"code": STATUS_ERROR, "message": error} if error else {"code": STATUS_OK},
+        }
+
+    # ---- output ----
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        spans, self._buffer = self._buffer, []
+        if self._fh is None:
+            return
+        doc = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [{"scope": {"name": "drun", "version": __version__}, "spans": spans}],
+                }
+            ]
+        }
+        self._fh.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def close(self, *, attributes: Optional[Mapping[str, Any]] = None, error: Optional[str] = None) -> None:
+        """Write the suite spans and the run span, then close the file."""
+        end_ns = time.time_ns()
+        with self._lock:
+            for suite in self._suites.values():
+                self._buffer.append(self._span_dict(
+                    suite["name"], self.trace_id, suite["span_id"], self.root_span_id,
+                    suite["start_ns"], suite["end_ns"], SPAN_KIND_INTERNAL, suite["attributes"], None,
+                ))
+            self.span_count += len(self._suites) + 1
+            self._suites = {}
+            self._buffer.append(self._span_dict(
+                "drun run", self.trace_id, self.root_span_id, "", self.start_ns, end_ns,
+                SPAN_KIND_INTERNAL, {"drun.span.type": "run", **(attributes or {})}, error,
+            ))
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+def set_active_tracer(tracer: Optional[Tracer]) -> None:
+    global _ACTIVE
+    _ACTIVE = tracer
+
+
+def active_tracer() -> Optional[Tracer]:
+    return _ACTIVE
+
+
+def trace_span(name: str, **kwargs: Any) -> ContextManager[Optional[Span]]:
+    """``tracer.span(...)`` of the active tracer, or a no-op when tracing is off."""
+    tracer = _ACTIVE
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, **kwargs)
@@ -15,6 +15,7 @@ import time
 import uuid
 from typing import Any
 
+import drun
 from drun.db.database_proxy import get_db
 
 
@@ -376,8 +377,9 @@ def hook_query_user_username(user_id: int) -> str:
         raise
 
 
+@drun.cache(ttl=300)
 def hook_query_user_email(user_id: int) -> str:
-    """从数据库查询用户邮箱
+    """从数据库查询用户邮箱（同一次运行内按 user_id 缓存 5 分钟）
     SQL: SELECT email FROM users WHERE id={user_id}
     """
     proxy = _get_db_proxy()